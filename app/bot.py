@@ -1,4 +1,6 @@
+import asyncio
 import os
+import tempfile
 from telegram import (
     Update,
     ReplyKeyboardMarkup,
@@ -11,13 +13,14 @@ from telegram.ext import (
     ContextTypes,
     filters
 )
+from telegram.error import TelegramError
 
-from process_media import process_image, process_video
+from jobs import JobQueue, QueueFull, run_image_bytes, run_video
+from result_cache import ResultCache, sha256_bytes, sha256_file
 
 TOKEN = ""
 
 DOWNLOAD_DIR = "bot_data"
-os.makedirs(DOWNLOAD_DIR, exist_ok=True)
 
 # ---------- КНОПКИ ----------
 MAIN_KEYBOARD = ReplyKeyboardMarkup(
@@ -33,6 +36,48 @@ MAIN_KEYBOARD = ReplyKeyboardMarkup(
 # ---------- СОСТОЯНИЕ ----------
 USER_STATE = {}
 
+# ---------- ОЧЕРЕДЬ ЗАДАЧ ----------
+# очередь (пул процессов) и кэш создаются в main() и лежат в bot_data:
+# со spawn этот модуль заново импортируется в каждом воркере и в Manager
+ACTIVE_JOBS = {}        # uid -> токены отмены запущенных видео
+PROGRESS_INTERVAL = 3   # сек между правками статуса (лимиты Telegram на edit)
+JOB_ERROR = "❌ Не удалось обработать файл, попробуй ещё раз"
+
+
+async def send_result(update, kind, path):
+    with open(path, "rb") as f:
+        if kind == "photo":
+            await update.message.reply_photo(photo=f, caption="✅ Готово!", reply_markup=MAIN_KEYBOARD)
+        else:
+            await update.message.reply_video(video=f, caption="✅ Готово!", reply_markup=MAIN_KEYBOARD)
+
+async def watch_progress(status, job, progress):
+    """
+    Ждёт задачу и раз в PROGRESS_INTERVAL правит одно сообщение статуса,
+    если прогресс изменился.
+    """
+    task = asyncio.ensure_future(job)
+    shown = None
+    while True:
+        finished, _ = await asyncio.wait({task}, timeout=PROGRESS_INTERVAL)
+        if finished:
+            return task.result()
+
+        state = progress.copy()
+        if not state["done"]:
+            continue
+        if state["total"]:
+            percent = int(state["done"] * 100 / state["total"])
+            text = f"⏳ Обрабатываю видео... {percent}% ({state['done']}/{state['total']} кадров)"
+        else:
+            text = f"⏳ Обрабатываю видео... {state['done']} кадров"
+        if text != shown:
+            shown = text
+            try:
+                await status.edit_text(text)
+            except TelegramError:
+                pass
+
 # ---------- /start ----------
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     USER_STATE[update.effective_user.id] = None
@@ -80,6 +125,9 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     elif text == "❌ Отмена":
         USER_STATE[uid] = None
+        # запущенное видео останавливается в воркере на следующем кадре
+        for cancel in ACTIVE_JOBS.get(uid, ()):
+            cancel.set()
         await update.message.reply_text(
             "❌ Действие отменено",
             reply_markup=MAIN_KEYBOARD
@@ -95,22 +143,45 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("⚠️ Сначала выбери «Обработать изображение»")
         return
 
+    jobs, cache = context.bot_data["jobs"], context.bot_data["cache"]
     photo = update.message.photo[-1]
-    file = await photo.get_file()
+    file_key = f"photo:{photo.file_unique_id}"
+    cached = cache.get(file_key, count_miss=False)
+    if cached is not None:
+        await send_result(update, "photo", cached)
+        USER_STATE[uid] = None
+        return
 
-    input_path = os.path.join(DOWNLOAD_DIR, f"{uid}_input.jpg")
-    output_path = os.path.join(DOWNLOAD_DIR, f"{uid}_output.jpg")
+    # фото целиком в памяти: скачивание, декодирование и кодирование без файлов
+    file = await photo.get_file()
+    data = bytes(await file.download_as_bytearray())
 
-    await file.download_to_drive(input_path)
+    # то же содержимое под другим file_unique_id (например, пересланное)
+    hash_key = f"photo:sha256:{sha256_bytes(data)}"
+    cached = cache.get(hash_key, file_key, downloaded=True)
+    if cached is not None:
+        await send_result(update, "photo", cached)
+        USER_STATE[uid] = None
+        return
 
     await update.message.reply_text("⏳ Обрабатываю изображение...")
-    process_image(input_path, output_path)
+    try:
+        result = await jobs.run(uid, run_image_bytes, data)
+    except QueueFull:
+        await update.message.reply_text("⚠️ Сервер загружен, попробуй чуть позже")
+        return
+    except Exception as e:
+        print(f"Ошибка обработки фото {uid}: {e!r}")
+        await update.message.reply_text(JOB_ERROR, reply_markup=MAIN_KEYBOARD)
+        USER_STATE[uid] = None
+        return
 
     await update.message.reply_photo(
-        photo=open(output_path, "rb"),
+        photo=result,
         caption="✅ Готово!",
         reply_markup=MAIN_KEYBOARD
     )
+    cache.put_bytes([file_key, hash_key], result, ".jpg", len(data))
 
     USER_STATE[uid] = None
 
@@ -121,28 +192,61 @@ async def handle_video(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("⚠️ Сначала выбери «Обработать видео»")
         return
 
+    jobs, cache = context.bot_data["jobs"], context.bot_data["cache"]
     video = update.message.video
-    file = await video.get_file()
-
-    input_path = os.path.join(DOWNLOAD_DIR, f"{uid}_input.mp4")
-    output_path = os.path.join(DOWNLOAD_DIR, f"{uid}_output.mp4")
-
-    await file.download_to_drive(input_path)
-
-    await update.message.reply_text("⏳ Обрабатываю видео...")
-    process_video(input_path, output_path)
-
-    await update.message.reply_video(
-        video=open(output_path, "rb"),
-        caption="✅ Готово!",
-        reply_markup=MAIN_KEYBOARD
-    )
+    file_key = f"video:{video.file_unique_id}"
+    cached = cache.get(file_key, count_miss=False)
+    if cached is None:
+        # свои временные файлы на каждый запрос: параллельные видео
+        # одного пользователя не перезаписывают друг друга
+        with tempfile.TemporaryDirectory(dir=DOWNLOAD_DIR) as tmp:
+            input_path = os.path.join(tmp, "input.mp4")
+            output_path = os.path.join(tmp, "output.mp4")
+
+            file = await video.get_file()
+            await file.download_to_drive(input_path)
+
+            # хэш всего файла — в отдельном потоке, чтобы не держать цикл событий
+            hash_key = f"video:sha256:{await asyncio.to_thread(sha256_file, input_path)}"
+            cached = cache.get(hash_key, file_key, downloaded=True)
+
+            if cached is None:
+                status = await update.message.reply_text("⏳ Обрабатываю видео...")
+                cancel, progress = jobs.control()
+                ACTIVE_JOBS.setdefault(uid, set()).add(cancel)
+                try:
+                    result = await watch_progress(
+                        status,
+                        jobs.run(uid, run_video, input_path, output_path, progress, cancel),
+                        progress
+                    )
+                except QueueFull:
+                    await status.edit_text("⚠️ Сервер загружен, попробуй чуть позже")
+                    return
+                except Exception as e:
+                    print(f"Ошибка обработки видео {uid}: {e!r}")
+                    await status.edit_text(JOB_ERROR)
+                    USER_STATE[uid] = None
+                    return
+                finally:
+                    ACTIVE_JOBS[uid].discard(cancel)
+                    if not ACTIVE_JOBS[uid]:
+                        del ACTIVE_JOBS[uid]
+
+                if result is None:
+                    await status.edit_text("❌ Обработка видео отменена")
+                    return
+                cached = cache.put_file([file_key, hash_key], output_path,
+                                        video.file_size or 0, move=True)
+
+    await send_result(update, "video", cached)
 
     USER_STATE[uid] = None
 
 # ---------- MAIN ----------
 def main():
-    app = ApplicationBuilder().token(TOKEN).build()
+    # concurrent_updates: пока одна задача ждёт воркер, бот отвечает остальным
+    app = ApplicationBuilder().token(TOKEN).concurrent_updates(True).build()
 
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("help", help_cmd))
@@ -151,8 +255,21 @@ def main():
     app.add_handler(MessageHandler(filters.PHOTO, handle_photo))
     app.add_handler(MessageHandler(filters.VIDEO, handle_video))
 
-    print("🤖 Бот запущен")
-    app.run_polling()
+    os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+    jobs = JobQueue()
+    # повторно присланное фото/видео отдаётся без скачивания и инференса
+    app.bot_data["cache"] = ResultCache(
+        os.path.join(DOWNLOAD_DIR, "cache"),
+        max_bytes=int(os.environ.get("AI_RESULT_CACHE_MB", "512")) * 1024 * 1024
+    )
+    app.bot_data["jobs"] = jobs
+
+    jobs.start()
+    print(f"🤖 Бот запущен (воркеров: {jobs.workers})")
+    try:
+        app.run_polling()
+    finally:
+        jobs.shutdown()
 
 if __name__ == "__main__":
     main()
@@ -1,16 +1,220 @@
-from ultralytics import YOLO
+import os
+
+import cv2
+import numpy as np
+
+MODEL_NAME = "yolov8n"
+MODEL_DIR = "models/detector"  # кэш экспортированных моделей
+BACKENDS = ("torch", "onnx", "openvino")
+
+
+# -------------------- ЭКСПОРТ --------------------
+def export_model(backend, int8=False):
+    """
+    Однократный экспорт yolov8n.pt в ONNX / OpenVINO IR с кэшем в MODEL_DIR.
+    INT8: для ONNX — динамическая квантизация весов onnxruntime,
+    для OpenVINO — калибровка ultralytics (нужен датасет coco8).
+    Возвращает путь к модели (.onnx или .xml).
+    """
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    suffix = "_int8" if int8 else ""
+
+    if backend == "onnx":
+        path = os.path.join(MODEL_DIR, f"{MODEL_NAME}{suffix}.onnx")
+        if os.path.exists(path):
+            return path
+        fp32 = os.path.join(MODEL_DIR, f"{MODEL_NAME}.onnx")
+        if not os.path.exists(fp32):
+            from ultralytics import YOLO
+            exported = YOLO(f"{MODEL_NAME}.pt").export(format="onnx", dynamic=True, simplify=True)
+            os.replace(exported, fp32)
+        if int8:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            quantize_dynamic(fp32, path, weight_type=QuantType.QUInt8)
+        return path
+
+    if backend == "openvino":
+        folder = os.path.join(MODEL_DIR, f"{MODEL_NAME}{suffix}_openvino_model")
+        path = os.path.join(folder, f"{MODEL_NAME}.xml")
+        if os.path.exists(path):
+            return path
+        from ultralytics import YOLO
+        exported = YOLO(f"{MODEL_NAME}.pt").export(format="openvino", dynamic=True, int8=int8)
+        if os.path.exists(folder):
+            import shutil
+            shutil.rmtree(folder)
+        os.replace(exported, folder)
+        return path
+
+    raise ValueError(f"Неизвестный бэкенд для экспорта: {backend}")
+
+
+def letterbox(frame, size):
+    """Вписывает кадр в квадрат size x size с полями 114, как ultralytics."""
+    h, w = frame.shape[:2]
+    r = min(size / h, size / w)
+    nw, nh = round(w * r), round(h * r)
+    img = cv2.resize(frame, (nw, nh), interpolation=cv2.INTER_LINEAR) if (nw, nh) != (w, h) else frame
+    px, py = (size - nw) // 2, (size - nh) // 2
+    out = np.full((size, size, 3), 114, dtype=np.uint8)
+    out[py:py + nh, px:px + nw] = img
+    return out, r, px, py
+
+
+def postprocess(pred, conf, r, px, py, iou=0.7):
+    """
+    Выход YOLOv8 (84, N): cx, cy, w, h + 80 классов. Оставляет класс 0 (человек),
+    NMS и возврат в координаты кадра до letterbox.
+    """
+    pred = pred.T
+    scores = pred[:, 4]
+    keep = scores >= conf
+    pred, scores = pred[keep], scores[keep]
+    if len(pred) == 0:
+        return np.zeros((0, 4), dtype=np.float32)
+
+    cx, cy, w, h = pred[:, 0], pred[:, 1], pred[:, 2], pred[:, 3]
+    xywh = np.stack([cx - w / 2, cy - h / 2, w, h], axis=1)
+    idx = cv2.dnn.NMSBoxes(xywh.tolist(), scores.tolist(), conf, iou)
+    idx = np.asarray(idx, dtype=int).reshape(-1)
+
+    boxes = xywh[idx].copy()
+    boxes[:, 2] += boxes[:, 0]
+    boxes[:, 3] += boxes[:, 1]
+    boxes[:, [0, 2]] = (boxes[:, [0, 2]] - px) / r
+    boxes[:, [1, 3]] = (boxes[:, [1, 3]] - py) / r
+    return boxes
+
+
+def _stride_size(imgsz):
+    # экспортированные модели требуют сторону, кратную 32
+    return -(-imgsz // 32) * 32
+
+
+def _blob(images):
+    batch = np.stack([cv2.cvtColor(img, cv2.COLOR_BGR2RGB) for img in images])
+    return np.ascontiguousarray(batch.transpose(0, 3, 1, 2), dtype=np.float32) / 255.0
+
+
+# -------------------- БЭКЕНДЫ --------------------
+class TorchBackend:
+    def __init__(self, int8=False):
+        # INT8 для PyTorch-пути не поддерживается — флаг игнорируется
+        from ultralytics import YOLO
+        self.model = YOLO(f"{MODEL_NAME}.pt")
+
+    def predict(self, frames, imgsz, conf):
+        results = self.model(frames, imgsz=imgsz, conf=conf, classes=[0], verbose=False)
+        return [r.boxes.xyxy.cpu().numpy() for r in results]
+
+
+class OnnxBackend:
+    def __init__(self, int8=False):
+        import onnxruntime as ort
+        self.session = ort.InferenceSession(
+            export_model("onnx", int8),
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, frames, imgsz, conf):
+        boxed = [letterbox(f, _stride_size(imgsz)) for f in frames]
+        preds = self.session.run(None, {self.input_name: _blob([b[0] for b in boxed])})[0]
+        return [postprocess(p, conf, r, px, py) for p, (_, r, px, py) in zip(preds, boxed)]
+
+
+class OpenVinoBackend:
+    def __init__(self, int8=False):
+        import openvino as ov
+        core = ov.Core()
+        self.model = core.compile_model(export_model("openvino", int8), "CPU")
+
+    def predict(self, frames, imgsz, conf):
+        boxed = [letterbox(f, _stride_size(imgsz)) for f in frames]
+        preds = self.model(_blob([b[0] for b in boxed]))[self.model.output(0)]
+        return [postprocess(p, conf, r, px, py) for p, (_, r, px, py) in zip(preds, boxed)]
+
+
+def make_backend(name, int8=False):
+    if name == "torch":
+        return TorchBackend(int8)
+    if name == "onnx":
+        return OnnxBackend(int8)
+    if name == "openvino":
+        return OpenVinoBackend(int8)
+    raise ValueError(f"Неизвестный бэкенд детектора: {name} (есть: {', '.join(BACKENDS)})")
+
 
 class PersonDetector:
-    def __init__(self):
-        self.model = YOLO("yolov8n.pt")
+    def __init__(self, imgsz=640, conf=0.5, backend="torch", int8=False):
+        self.backend = make_backend(backend, int8)
+        self.imgsz = imgsz  # длинная сторона кадра для инференса
+        self.conf = conf
 
     def detect(self, frame):
-        results = self.model(frame, conf=0.5, classes=[0])
-        boxes = []
+        return [tuple(b) for b in self.detect_batch([frame])[0].tolist()]
+
+    def detect_batch(self, frames):
+        """
+        Детекция людей сразу на пачке кадров одним вызовом модели.
+        Кадры уменьшаются до imgsz по длинной стороне, боксы
+        возвращаются в координатах исходного кадра.
+        Возвращает по массиву боксов (N, 4) int (x1, y1, x2, y2) на кадр.
+        """
+        small, scales = [], []
+        for frame in frames:
+            h, w = frame.shape[:2]
+            scale = min(1.0, self.imgsz / max(h, w))
+            if scale < 1.0:
+                frame = cv2.resize(frame, (round(w * scale), round(h * scale)),
+                                   interpolation=cv2.INTER_AREA)
+            small.append(frame)
+            scales.append(scale)
+
+        results = self.backend.predict(small, self.imgsz, self.conf)
+        return [(boxes / scale).astype(int) for boxes, scale in zip(results, scales)]
+
+
+class ResolutionController:
+    """
+    Подстраивает imgsz детектора под целевой FPS живого цикла:
+    медленно — уменьшаем разрешение, есть запас — увеличиваем.
+    """
+
+    def __init__(self, detector, target_fps=15, sizes=(320, 416, 512, 640),
+                 smoothing=0.9, hysteresis=0.15, cooldown=15):
+        self.detector = detector
+        self.target_fps = target_fps
+        self.sizes = sorted(sizes)
+        self.smoothing = smoothing
+        self.hysteresis = hysteresis
+        self.cooldown = cooldown
+
+        # стартуем с ближайшего размера не больше текущего
+        fit = [i for i, s in enumerate(self.sizes) if s <= detector.imgsz]
+        self.idx = fit[-1] if fit else 0
+        if self.sizes[self.idx] != detector.imgsz:
+            print(
+                f"Предупреждение: imgsz={detector.imgsz} вне шагов автоподстройки "
+                f"{self.sizes}, стартуем с {self.sizes[self.idx]}"
+            )
+        self.detector.imgsz = self.sizes[self.idx]
+        self.fps = None
+        self.since_change = 0
+
+    def update(self, frame_seconds):
+        """Передаётся время обработки кадра; возвращает текущий imgsz."""
+        fps = 1.0 / max(frame_seconds, 1e-6)
+        self.fps = fps if self.fps is None else self.smoothing * self.fps + (1 - self.smoothing) * fps
+        self.since_change += 1
 
-        for r in results:
-            for box in r.boxes:
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                boxes.append((x1, y1, x2, y2))
+        if self.since_change >= self.cooldown:
+            if self.fps < self.target_fps * (1 - self.hysteresis) and self.idx > 0:
+                self.idx -= 1
+                self.since_change = 0
+            elif self.fps > self.target_fps * (1 + self.hysteresis) and self.idx < len(self.sizes) - 1:
+                self.idx += 1
+                self.since_change = 0
+            self.detector.imgsz = self.sizes[self.idx]
 
-        return boxes
+        return self.detector.imgsz
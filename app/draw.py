@@ -1,28 +1,107 @@
+from collections import OrderedDict
+from functools import lru_cache
+
 from PIL import Image, ImageDraw, ImageFont
 import cv2
 import numpy as np
 
 FONT_PATH = "app/fonts/DejaVuSans.ttf"
+PADDING = 2  # раньше было 5
+
+
+@lru_cache(maxsize=None)
+def get_font(size):
+    return ImageFont.truetype(FONT_PATH, size)
 
-def draw_text(frame, text, pos, size=28):
+
+def render_label(text, size=28):
+    """
+    Растеризует подпись (белый текст на чёрной плашке) в BGR-спрайт.
+    Возвращает (sprite, (dx, dy)) — смещение левого верхнего угла
+    спрайта относительно точки вывода текста.
+    """
     try:
-        font = ImageFont.truetype(FONT_PATH, size)
-        img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-        draw = ImageDraw.Draw(img)
-        bbox = draw.textbbox(pos, text, font=font)
-        
-        # Уменьшенные отступы
-        padding = 2  # раньше было 5
-        draw.rectangle([bbox[0]-padding, bbox[1]-padding, bbox[2]+padding, bbox[3]+padding], fill=(0,0,0))
-        draw.text(pos, text, font=font, fill=(255,255,255))
-        return cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-    
+        font = get_font(size)
+        x1, y1, x2, y2 = font.getbbox(text)
+        w, h = x2 - x1 + 2 * PADDING, y2 - y1 + 2 * PADDING
+        img = Image.new("L", (w, h), 0)
+        ImageDraw.Draw(img).text((PADDING - x1, PADDING - y1), text, font=font, fill=255)
+        gray = np.array(img)
+        return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR), (x1 - PADDING, y1 - PADDING)
+
     except Exception as e:
-        print(f"Ошибка в draw_text (PIL): {e}. Используем fallback OpenCV.")
+        print(f"Ошибка в render_label (PIL): {e}. Используем fallback OpenCV.")
         scale = size / 28
-        text_size = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, 2)[0]
-        padding = 2  # уменьшенный отступ
-        cv2.rectangle(frame, (pos[0]-padding, pos[1]-text_size[1]-padding), 
-                      (pos[0]+text_size[0]+padding, pos[1]+padding), (0,0,0), -1)
-        cv2.putText(frame, text, pos, cv2.FONT_HERSHEY_SIMPLEX, scale, (255,255,255), 2, cv2.LINE_AA)
+        (tw, th), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, 2)
+        sprite = np.zeros((th + baseline + 2 * PADDING, tw + 2 * PADDING, 3), dtype=np.uint8)
+        cv2.putText(sprite, text, (PADDING, PADDING + th), cv2.FONT_HERSHEY_SIMPLEX,
+                    scale, (255, 255, 255), 2, cv2.LINE_AA)
+        return sprite, (-PADDING, -th - PADDING)
+
+
+def blit(frame, sprite, x, y):
+    """
+    Копирует спрайт в кадр по координатам (x, y) с обрезкой по краям.
+    """
+    fh, fw = frame.shape[:2]
+    sh, sw = sprite.shape[:2]
+    x1, y1 = max(0, x), max(0, y)
+    x2, y2 = min(fw, x + sw), min(fh, y + sh)
+    if x2 <= x1 or y2 <= y1:
+        return
+    frame[y1:y2, x1:x2] = sprite[y1 - y:y2 - y, x1 - x:x2 - x]
+
+
+class OverlayRenderer:
+    """
+    Отрисовка всех боксов и подписей кадра за один проход.
+    Подписи растеризуются один раз и берутся из LRU-кэша спрайтов,
+    затем копируются прямо в BGR-кадр без конвертаций через PIL.
+    Меняющийся каждый кадр текст (FPS, счётчики) — с cache=False,
+    чтобы не вытеснять из кэша стабильные подписи людей.
+    """
+
+    def __init__(self, max_sprites=512):
+        self.max_sprites = max_sprites
+        self.sprites = OrderedDict()
+        self.rects = []
+        self.labels = []
+
+    def sprite(self, text, size):
+        key = (text, size)
+        item = self.sprites.get(key)
+        if item is None:
+            item = render_label(text, size)
+            self.sprites[key] = item
+            while len(self.sprites) > self.max_sprites:
+                self.sprites.popitem(last=False)
+        else:
+            self.sprites.move_to_end(key)
+        return item
+
+    def rect(self, p1, p2, color=(0, 255, 0), thickness=2):
+        self.rects.append((p1, p2, color, thickness))
+
+    def text(self, text, pos, size=28, cache=True):
+        self.labels.append((text, pos, size, cache))
+
+    def render(self, frame):
+        for p1, p2, color, thickness in self.rects:
+            cv2.rectangle(frame, p1, p2, color, thickness)
+
+        for text, (x, y), size, cache in self.labels:
+            sprite, (dx, dy) = self.sprite(text, size) if cache else render_label(text, size)
+            blit(frame, sprite, x + dx, y + dy)
+
+        self.rects = []
+        self.labels = []
         return frame
+
+
+_renderer = OverlayRenderer()
+
+
+def draw_text(frame, text, pos, size=28, cache=True):
+    sprite, (dx, dy) = _renderer.sprite(text, size) if cache else render_label(text, size)
+    blit(frame, sprite, pos[0] + dx, pos[1] + dy)
+    return frame
@@ -1,6 +1,8 @@
+import time
+from collections import OrderedDict
+
 import cv2
 import numpy as np
-from deepface import DeepFace  # Современная библиотека для распознавания эмоций (лучше FER+)
 
 # Перевод эмоций из DeepFace в русский (сопоставление по вашему списку)
 EMOTION_MAP = {
@@ -13,8 +15,15 @@ EMOTION_MAP = {
     "neutral": "нейтральная"
 }
 
+# Порядок выходов Keras-модели эмоций DeepFace
+DEEPFACE_LABELS = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+
 class EmotionRecognizer:
     def __init__(self):
+        # DeepFace импортируется здесь: EmotionCache и константы доступны без TensorFlow
+        from deepface import DeepFace  # Современная библиотека для распознавания эмоций (лучше FER+)
+        self.deepface = DeepFace
+
         # DeepFace не требует сессии ONNX — она использует встроенные модели (VGG-Face и др.)
         # Если нужно fallback на ONNX, можно добавить, но DeepFace лучше по умолчанию
         self.use_deepface = True  # Флаг для переключения (если ONNX нужен — False)
@@ -26,6 +35,9 @@ class EmotionRecognizer:
                 providers=["CPUExecutionProvider"]
             )
             self.input_name = self.session.get_inputs()[0].name
+            # модель с фиксированным батчем 1 нельзя кормить пачкой
+            batch_dim = self.session.get_inputs()[0].shape[0]
+            self.onnx_batched = not isinstance(batch_dim, int) or batch_dim != 1
             self.softmax = scipy.special.softmax  # Для ONNX
             self.emotions_ru = [  # EMOTIONS_RU для ONNX (из вашего оригинала)
                 "нейтральная", "счастлив", "удивлён", "грустный",
@@ -35,6 +47,24 @@ class EmotionRecognizer:
             print(f"Предупреждение: ONNX не загружен ({e}). Используем только DeepFace.")
             self.use_deepface = True
 
+        # Keras-модель эмоций DeepFace напрямую — для пакетного прогона
+        self.keras_model = None
+        try:
+            try:
+                client = self.deepface.build_model(model_name="Emotion", task="facial_attribute")
+            except TypeError:
+                client = self.deepface.build_model("Emotion")
+            self.keras_model = getattr(client, "model", client)
+        except Exception as e:
+            print(f"Предупреждение: пакетная модель DeepFace не загружена ({e}).")
+
+    @staticmethod
+    def _threshold(emo_ru, emo_prob):
+        # Порог: если вероятность <0.6, считаем "неуверенно"
+        if emo_prob < 0.6:
+            return "неуверенно", emo_prob
+        return emo_ru, emo_prob
+
     def predict(self, face_img):
         """
         Предсказывает эмоцию на изображении лица.
@@ -44,7 +74,7 @@ class EmotionRecognizer:
         if self.use_deepface:
             try:
                 # DeepFace анализ (enforce_detection=False, т.к. лицо уже обрезано)
-                result = DeepFace.analyze(
+                result = self.deepface.analyze(
                     face_img,
                     actions=['emotion'],
                     enforce_detection=False,
@@ -54,10 +84,7 @@ class EmotionRecognizer:
                 emo_en = result[0]['dominant_emotion']
                 emo_ru = EMOTION_MAP.get(emo_en, emo_en)  # Перевод или fallback
                 emo_prob = result[0]['emotion'][emo_en] / 100.0  # [0-1]
-                # Порог: если вероятность <0.6, считаем "неуверенно"
-                if emo_prob < 0.6:
-                    return "неуверенно", emo_prob
-                return emo_ru, emo_prob
+                return self._threshold(emo_ru, emo_prob)
             except Exception as e:
                 print(f"Ошибка DeepFace: {e}. Fallback на ONNX если доступен.")
                 if not hasattr(self, 'session'):
@@ -65,19 +92,134 @@ class EmotionRecognizer:
 
         # Fallback на ONNX (если DeepFace не сработал или флаг False)
         try:
-            gray = cv2.cvtColor(face_img, cv2.COLOR_BGR2GRAY)
-            gray = cv2.resize(gray, (64, 64))
-            gray = gray.astype("float32") / 255.0
-            gray = gray[np.newaxis, np.newaxis, :, :]
-            outputs = self.session.run(None, {self.input_name: gray})
-            logits = outputs[0][0]
-            probs = self.softmax(logits)
-            idx = int(np.argmax(probs))
-            emo_ru = self.emotions_ru[idx]
-            emo_prob = float(probs[idx])
-            if emo_prob < 0.6:
-                return "неуверенно", emo_prob
-            return emo_ru, emo_prob
+            outputs = self.session.run(None, {self.input_name: self._onnx_input([face_img])})
+            return self._onnx_result(outputs[0][0])
         except Exception as e:
             print(f"Ошибка ONNX: {e}")
-            return "ошибка", 0.0
\ No newline at end of file
+            return "ошибка", 0.0
+
+    def predict_batch(self, faces):
+        """
+        Распознаёт эмоции сразу для всех лиц кадра одним прогоном модели.
+        Возвращает список (эмоция_ру, вероятность [0-1]) в порядке faces.
+        """
+        if not faces:
+            return []
+
+        if self.use_deepface and self.keras_model is not None:
+            try:
+                # Та же подготовка, что у модели Emotion в DeepFace: серое 48x48 [0-1]
+                batch = np.stack([
+                    cv2.resize(cv2.cvtColor(f, cv2.COLOR_BGR2GRAY), (48, 48))
+                    for f in faces
+                ]).astype("float32") / 255.0
+                # прямой вызов модели: Model.predict на каждом кадре строит адаптер
+                # данных и колбэки, что для пары лиц 48x48 дольше самого прогона
+                preds = self.keras_model(batch[..., np.newaxis], training=False).numpy()
+                results = []
+                for p in preds:
+                    idx = int(np.argmax(p))
+                    emo_en = DEEPFACE_LABELS[idx]
+                    emo_prob = float(p[idx] / max(p.sum(), 1e-6))
+                    results.append(self._threshold(EMOTION_MAP[emo_en], emo_prob))
+                return results
+            except Exception as e:
+                print(f"Ошибка пакетного DeepFace: {e}. Обрабатываем лица по одному.")
+                return [self.predict(f) for f in faces]
+
+        if hasattr(self, 'session') and self.onnx_batched:
+            try:
+                outputs = self.session.run(None, {self.input_name: self._onnx_input(faces)})
+                return [self._onnx_result(logits) for logits in outputs[0]]
+            except Exception as e:
+                print(f"Ошибка пакетного ONNX: {e}")
+
+        return [self.predict(f) for f in faces]
+
+    # -------------------- ONNX --------------------
+    def _onnx_input(self, faces):
+        batch = np.stack([
+            cv2.resize(cv2.cvtColor(f, cv2.COLOR_BGR2GRAY), (64, 64))
+            for f in faces
+        ]).astype("float32") / 255.0
+        return batch[:, np.newaxis, :, :]
+
+    def _onnx_result(self, logits):
+        probs = self.softmax(logits)
+        idx = int(np.argmax(probs))
+        return self._threshold(self.emotions_ru[idx], float(probs[idx]))
+
+
+class EmotionCache:
+    """
+    Кэш эмоций по треку и области лица.
+    Результат живёт max_frames кадров (и/или max_seconds секунд),
+    пока лицо заметно не изменилось (average hash 8x8).
+    Вытеснение — LRU, счётчики hits/misses для настройки под нагрузкой.
+    """
+
+    def __init__(self, max_entries=256, max_frames=15, max_seconds=None,
+                 hash_threshold=6, region_grid=32):
+        self.max_entries = max_entries
+        self.max_frames = max_frames
+        self.max_seconds = max_seconds
+        self.hash_threshold = hash_threshold
+        self.region_grid = region_grid
+
+        self.entries = OrderedDict()
+        self.frame = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def next_frame(self):
+        self.frame += 1
+
+    @staticmethod
+    def face_hash(face_img):
+        gray = cv2.cvtColor(face_img, cv2.COLOR_BGR2GRAY)
+        small = cv2.resize(gray, (8, 8), interpolation=cv2.INTER_AREA)
+        bits = (small > small.mean()).flatten()
+        return int(np.packbits(bits).view(">u8")[0])
+
+    def _key(self, track_id, face_box):
+        g = self.region_grid
+        return (track_id,) + tuple(int(c) // g for c in face_box)
+
+    def get(self, track_id, face_box, face_img):
+        """
+        Возвращает (эмоция_ру, вероятность) из кэша или None.
+        """
+        key = self._key(track_id, face_box)
+        entry = self.entries.get(key)
+        if entry is not None:
+            result, h, frame, ts = entry
+            fresh = self.frame - frame < self.max_frames
+            if self.max_seconds is not None:
+                fresh = fresh and time.monotonic() - ts < self.max_seconds
+            if fresh and bin(h ^ self.face_hash(face_img)).count("1") <= self.hash_threshold:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return result
+            del self.entries[key]
+
+        self.misses += 1
+        return None
+
+    def put(self, track_id, face_box, face_img, result):
+        key = self._key(track_id, face_box)
+        self.entries[key] = (result, self.face_hash(face_img), self.frame, time.monotonic())
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self.entries),
+            "hit_rate": self.hits / total if total else 0.0
+        }
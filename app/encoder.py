@@ -0,0 +1,116 @@
+import shutil
+import subprocess
+
+import cv2
+
+ENCODERS = ("auto", "ffmpeg", "cv2")
+
+
+def ffmpeg_exe():
+    """
+    Бинарник ffmpeg: сначала из imageio-ffmpeg (ставится вместе с pip-пакетом),
+    затем из PATH. None — ffmpeg недоступен.
+    """
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        return shutil.which("ffmpeg")
+
+
+def output_size(size, max_side=None):
+    """Размер выхода с длинной стороной не больше max_side; стороны чётные (yuv420p)."""
+    w, h = size
+    scale = min(1.0, max_side / max(w, h)) if max_side else 1.0
+    return max(2, int(w * scale) // 2 * 2), max(2, int(h * scale) // 2 * 2)
+
+
+class FfmpegWriter:
+    """
+    H.264 через ffmpeg: кадры BGR идут в stdin по трубе.
+    yuv420p и faststart — файл сразу проигрывается в Telegram
+    без перекодирования на сервере.
+    """
+
+    def __init__(self, path, fps, size, out_size=None, preset="veryfast", crf=23,
+                 bitrate=None, exe=None):
+        w, h = size
+        out_w, out_h = out_size or output_size(size)
+        cmd = [
+            exe or ffmpeg_exe(), "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{w}x{h}", "-r", f"{fps or 25}",
+            "-i", "-", "-an"
+        ]
+        if (out_w, out_h) != (w, h):
+            cmd += ["-vf", f"scale={out_w}:{out_h}"]
+        cmd += ["-c:v", "libx264", "-preset", preset, "-pix_fmt", "yuv420p"]
+        if bitrate:
+            # потолок битрейта вместо постоянного качества
+            cmd += ["-b:v", bitrate, "-maxrate", bitrate, "-bufsize", bitrate]
+        else:
+            cmd += ["-crf", str(crf)]
+        cmd += ["-movflags", "+faststart", path]
+
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.released = False
+
+    def write(self, frame):
+        try:
+            self.proc.stdin.write(frame.tobytes())
+        except BrokenPipeError:
+            self.release()
+            raise
+
+    def release(self):
+        # повторный вызов (write при обрыве трубы, затем FrameWriter.close)
+        # ничего не делает: ошибка ffmpeg с его stderr поднимается один раз
+        if self.released:
+            return
+        self.released = True
+        if self.proc.stdin and not self.proc.stdin.closed:
+            try:
+                self.proc.stdin.close()
+            except BrokenPipeError:
+                pass
+        err = self.proc.stderr.read().decode(errors="replace").strip()
+        if self.proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg завершился с ошибкой (код {self.proc.returncode}): {err}")
+
+
+class CvWriter:
+    """Запасной вариант: cv2.VideoWriter (mp4v) с уменьшением кадра до out_size."""
+
+    def __init__(self, path, fps, size, out_size=None):
+        self.out_size = out_size or output_size(size)
+        self.writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, self.out_size)
+
+    def write(self, frame):
+        if frame.shape[1::-1] != self.out_size:
+            frame = cv2.resize(frame, self.out_size, interpolation=cv2.INTER_AREA)
+        self.writer.write(frame)
+
+    def release(self):
+        self.writer.release()
+
+
+def open_writer(path, fps, size, encoder="auto", max_side=None, bitrate=None, preset="veryfast"):
+    """
+    Кодировщик видео с интерфейсом cv2.VideoWriter (write/release).
+    encoder: "ffmpeg" — H.264 через ffmpeg, "cv2" — mp4v,
+    "auto" — ffmpeg, если он есть, иначе cv2.
+    max_side — ограничение длинной стороны выхода, bitrate — например "2M"
+    (для cv2 не поддерживается).
+    """
+    if encoder not in ENCODERS:
+        raise ValueError(f"Неизвестный кодировщик: {encoder} (есть: {', '.join(ENCODERS)})")
+    out_size = output_size(size, max_side)
+
+    if encoder != "cv2":
+        exe = ffmpeg_exe()
+        if exe:
+            return FfmpegWriter(path, fps, size, out_size, preset=preset, bitrate=bitrate, exe=exe)
+        if encoder == "ffmpeg":
+            raise RuntimeError("ffmpeg не найден: pip install imageio-ffmpeg")
+        print("Предупреждение: ffmpeg не найден, видео пишется через cv2 (mp4v).")
+
+    return CvWriter(path, fps, size, out_size)
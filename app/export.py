@@ -0,0 +1,77 @@
+import csv
+import json
+
+import numpy as np
+
+# Плоская запись «человек в кадре» — одинаковая для JSONL, CSV и NumPy
+RECORD_FIELDS = [
+    ("frame", np.int32),
+    ("track", np.int32),
+    ("x1", np.int32), ("y1", np.int32), ("x2", np.int32), ("y2", np.int32),
+    ("action", "U32"), ("action_prob", np.float32),
+    ("intent", "U32"), ("intent_prob", np.float32),
+    ("emotion", "U16"), ("emotion_prob", np.float32),
+    ("gesture", "U32"), ("gesture_prob", np.float32),
+    ("interpolated", np.bool_)
+]
+RECORD_DTYPE = np.dtype(RECORD_FIELDS)
+FIELD_NAMES = [name for name, _ in RECORD_FIELDS]
+
+
+class JsonlSink:
+    """Одна JSON-строка на человека в кадре."""
+
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write(self, records):
+        for r in records:
+            self.file.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+class CsvSink:
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8", newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=FIELD_NAMES)
+        self.writer.writeheader()
+
+    def write(self, records):
+        self.writer.writerows(records)
+
+    def close(self):
+        self.file.close()
+
+
+class NumpySink:
+    """
+    Собирает записи в структурированный массив RECORD_DTYPE.
+    С путём — сохраняет .npy при закрытии.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.rows = []
+
+    def write(self, records):
+        self.rows.extend(tuple(r[name] for name in FIELD_NAMES) for r in records)
+
+    def array(self):
+        return np.array(self.rows, dtype=RECORD_DTYPE)
+
+    def close(self):
+        if self.path:
+            np.save(self.path, self.array())
+
+
+def open_sink(path):
+    """Выбор формата по расширению: .jsonl, .csv, .npy."""
+    if path.endswith(".jsonl"):
+        return JsonlSink(path)
+    if path.endswith(".csv"):
+        return CsvSink(path)
+    if path.endswith(".npy"):
+        return NumpySink(path)
+    raise ValueError(f"Неизвестный формат выгрузки: {path} (есть .jsonl, .csv, .npy)")
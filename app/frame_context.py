@@ -0,0 +1,49 @@
+import cv2
+
+
+class FrameContext:
+    """
+    Общий контекст кадра для всех стадий: BGR-кадр, ленивый RGB
+    и кэш вырезок по боксам. Вырезки BGR — срезы без копирования,
+    RGB считается один раз на вырезку и переиспользуется позой, лицом и руками.
+    """
+
+    def __init__(self, frame):
+        self.bgr = frame
+        self.shape = frame.shape
+        self._rgb = None
+        self._crops = {}
+        self._crops_rgb = {}
+
+    @property
+    def rgb(self):
+        if self._rgb is None:
+            self._rgb = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB)
+        return self._rgb
+
+    def clip(self, box):
+        h, w = self.shape[:2]
+        x1, y1, x2, y2 = [int(c) for c in box]
+        return max(0, x1), max(0, y1), min(w, x2), min(h, y2)
+
+    def crop(self, box):
+        box = self.clip(box)
+        crop = self._crops.get(box)
+        if crop is None:
+            x1, y1, x2, y2 = box
+            crop = self.bgr[y1:y2, x1:x2]
+            self._crops[box] = crop
+        return crop
+
+    def crop_rgb(self, box):
+        box = self.clip(box)
+        crop = self._crops_rgb.get(box)
+        if crop is None:
+            x1, y1, x2, y2 = box
+            if self._rgb is not None:
+                # полный RGB уже есть — срез без новой конвертации
+                crop = self._rgb[y1:y2, x1:x2]
+            else:
+                crop = cv2.cvtColor(self.crop(box), cv2.COLOR_BGR2RGB)
+            self._crops_rgb[box] = crop
+        return crop
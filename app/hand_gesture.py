@@ -1,25 +1,33 @@
+import math
+
 import cv2
 import mediapipe as mp
 import numpy as np
 
+# Точки позы MediaPipe для кистей: запястье, мизинец, указательный, большой
+HAND_POINTS = {
+    "left": (15, 17, 19, 21),
+    "right": (16, 18, 20, 22)
+}
+
 class HandGestureRecognizer:
-    def __init__(self):
+    """
+    Жесты по ROI кистей из позы: один граф MediaPipe Hands на процесс,
+    все ROI кадра проходят через него одной мозаикой (detect_batch).
+    """
+
+    def __init__(self, tile=160, max_tiles=8):
+        self.tile = tile
+        self.max_tiles = max_tiles
+        # плитки мозаики независимы — режим статичных изображений
         self.hands = mp.solutions.hands.Hands(
-            static_image_mode=False,
-            max_num_hands=2,
-            min_detection_confidence=0.6,
-            min_tracking_confidence=0.6
+            static_image_mode=True,
+            max_num_hands=max_tiles,
+            min_detection_confidence=0.6
         )
 
-    def detect(self, frame):
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        result = self.hands.process(rgb)
-
-        if not result.multi_hand_landmarks:
-            return None, 0.0
-
-        lm = result.multi_hand_landmarks[0].landmark
-
+    @staticmethod
+    def classify(lm):
         def up(a, b): return lm[a].y < lm[b].y
 
         fingers = {
@@ -47,3 +55,60 @@ class HandGestureRecognizer:
             return "жест телефон", 0.8
 
         return "жест рукой", 0.6
+
+    # -------------------- ROI ПО ПОЗЕ --------------------
+    @staticmethod
+    def hand_rois(landmarks, shape, min_visibility=0.5, scale=3.0, min_size=24):
+        """
+        Квадратные ROI кистей вокруг точек запястья (15/16) и пальцев (17-22) позы.
+        Невидимые запястья пропускаются — тогда руки не ищутся вовсе.
+        """
+        h, w = shape[:2]
+        rois = []
+        for ids in HAND_POINTS.values():
+            if landmarks[ids[0]].visibility < min_visibility:
+                continue
+            xs = [landmarks[i].x * w for i in ids]
+            ys = [landmarks[i].y * h for i in ids]
+            cx, cy = sum(xs) / len(xs), sum(ys) / len(ys)
+            reach = max(math.hypot(x - xs[0], y - ys[0]) for x, y in zip(xs, ys))
+            side = max(min_size, reach * scale)
+            x1 = int(max(0, cx - side / 2))
+            y1 = int(max(0, cy - side / 2))
+            x2 = int(min(w, cx + side / 2))
+            y2 = int(min(h, cy + side / 2))
+            if x2 - x1 >= min_size // 2 and y2 - y1 >= min_size // 2:
+                rois.append((x1, y1, x2, y2))
+        return rois
+
+    def detect_batch(self, rois_rgb):
+        """
+        Жесты для всех ROI кадра: ROI складываются в одну мозаику
+        и проходят через MediaPipe Hands одним вызовом.
+        Возвращает (жест, вероятность) на ROI, (None, 0.0) — рука не найдена.
+        """
+        results = []
+        for i in range(0, len(rois_rgb), self.max_tiles):
+            results.extend(self._detect_mosaic(rois_rgb[i:i + self.max_tiles]))
+        return results
+
+    def _detect_mosaic(self, rois_rgb):
+        t = self.tile
+        cols = math.ceil(math.sqrt(len(rois_rgb)))
+        rows = math.ceil(len(rois_rgb) / cols)
+        mosaic = np.zeros((rows * t, cols * t, 3), dtype=np.uint8)
+        for i, roi in enumerate(rois_rgb):
+            r, c = divmod(i, cols)
+            mosaic[r * t:(r + 1) * t, c * t:(c + 1) * t] = cv2.resize(roi, (t, t))
+
+        out = [(None, 0.0)] * len(rois_rgb)
+        result = self.hands.process(mosaic)
+        for hand in result.multi_hand_landmarks or []:
+            lm = hand.landmark
+            # плитка, в которую попал центр кисти
+            c = min(cols - 1, max(0, int(np.mean([p.x for p in lm]) * cols)))
+            r = min(rows - 1, max(0, int(np.mean([p.y for p in lm]) * rows)))
+            i = r * cols + c
+            if i < len(out) and out[i][0] is None:
+                out[i] = self.classify(lm)
+        return out
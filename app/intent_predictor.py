@@ -10,11 +10,19 @@ class IntentPredictor:
         self.last_action = "стоит"
 
     # -------------------- UPDATE --------------------
-    def update(self, bbox, pose):
+    def update(self, bbox, pose, frames=1):
+        # frames > 1: с прошлого обновления пропущено несколько кадров,
+        # промежуточные позиции восстанавливаются линейно (скорость — за кадр)
         x1, y1, x2, y2 = bbox
         cx = (x1 + x2) / 2
         cy = (y1 + y2) / 2
 
+        if self.positions and frames > 1:
+            px, py = self.positions[-1]
+            for k in range(1, frames):
+                self.body_speed_hist.append(math.hypot(cx - px, cy - py) / frames)
+                self.positions.append((px + (cx - px) * k / frames, py + (cy - py) * k / frames))
+
         if self.positions:
             px, py = self.positions[-1]
             speed = math.hypot(cx - px, cy - py)
@@ -121,3 +129,194 @@ class IntentPredictor:
             return "продолжит движение", 0.85
 
         return "анализ...", 0.4
+
+
+# ==================== ВЕКТОРНЫЙ ВАРИАНТ ДЛЯ МНОГИХ ТРЕКОВ ====================
+ACTIONS = [
+    "стоит", "идёт", "бежит", "машет рукой", "хлопает", "absolute cinema",
+    "наклоняется", "прыгает", "подпрыгивает", "активно двигается"
+]
+INTENTS = ["собирается остановиться", "собирается прыгнуть", "продолжит движение", "анализ..."]
+INTENT_CONF = [0.8, 0.75, 0.85, 0.4]
+
+# точки позы для правил: левое/правое плечо, левое/правое запястье, нос
+POSE_POINTS = (11, 12, 15, 16, 0)
+
+
+class IntentBank:
+    """
+    Состояние IntentPredictor для всех треков в одной структуре:
+    кольцевые буферы NumPy фиксированного размера вместо deque.
+    Признаки и правила считаются одним векторным вызовом для всех треков,
+    результат для каждого человека совпадает с IntentPredictor.
+    """
+
+    def __init__(self, capacity=32, pos_len=25, hist_len=10):
+        self.pos_len = pos_len
+        self.hist_len = hist_len
+        self.free = []
+        self.size = 0
+        self._alloc(capacity)
+
+    def _alloc(self, capacity):
+        def grow(arr, shape):
+            new = np.zeros(shape, dtype=arr.dtype if arr is not None else np.float64)
+            if arr is not None:
+                new[:len(arr)] = arr
+            return new
+
+        old = getattr(self, "positions", None)
+        n = 0 if old is None else len(old)
+        self.positions = grow(old, (capacity, self.pos_len, 2))
+        self.speeds = grow(getattr(self, "speeds", None), (capacity, self.hist_len))
+        self.hands = grow(getattr(self, "hands", None), (capacity, self.hist_len))
+        for name, dtype in (("pos_head", np.int64), ("pos_count", np.int64),
+                            ("speed_head", np.int64), ("speed_count", np.int64),
+                            ("hand_head", np.int64), ("hand_count", np.int64)):
+            arr = getattr(self, name, None)
+            new = np.zeros(capacity, dtype=dtype)
+            if arr is not None:
+                new[:len(arr)] = arr
+            setattr(self, name, new)
+        self.last_action = getattr(self, "last_action", []) + ["стоит"] * (capacity - n)
+
+    # -------------------- СЛОТЫ --------------------
+    def add(self):
+        if self.free:
+            slot = self.free.pop()
+        else:
+            if self.size == len(self.positions):
+                self._alloc(2 * len(self.positions))
+            slot = self.size
+            self.size += 1
+        for name in ("pos_head", "pos_count", "speed_head", "speed_count", "hand_head", "hand_count"):
+            getattr(self, name)[slot] = 0
+        self.last_action[slot] = "стоит"
+        return slot
+
+    def release(self, slot):
+        self.free.append(slot)
+
+    # -------------------- UPDATE --------------------
+    def _push(self, buf, head, count, slot, value, maxlen):
+        buf[slot, head[slot]] = value
+        head[slot] = (head[slot] + 1) % maxlen
+        count[slot] = min(count[slot] + 1, maxlen)
+
+    def _last_pos(self, slot, back=1):
+        return self.positions[slot, (self.pos_head[slot] - back) % self.pos_len]
+
+    def update(self, slot, bbox, pose, frames=1):
+        # те же правила, что IntentPredictor.update, но запись в кольцевые буферы
+        x1, y1, x2, y2 = bbox
+        cx = (x1 + x2) / 2
+        cy = (y1 + y2) / 2
+
+        if self.pos_count[slot] and frames > 1:
+            px, py = (float(v) for v in self._last_pos(slot))
+            for k in range(1, frames):
+                self._push(self.speeds, self.speed_head, self.speed_count, slot,
+                           math.hypot(cx - px, cy - py) / frames, self.hist_len)
+                self._push(self.positions, self.pos_head, self.pos_count, slot,
+                           (px + (cx - px) * k / frames, py + (cy - py) * k / frames), self.pos_len)
+
+        if self.pos_count[slot]:
+            px, py = (float(v) for v in self._last_pos(slot))
+            self._push(self.speeds, self.speed_head, self.speed_count, slot,
+                       math.hypot(cx - px, cy - py), self.hist_len)
+
+        self._push(self.positions, self.pos_head, self.pos_count, slot, (cx, cy), self.pos_len)
+
+        lw, rw = pose[15], pose[16]
+        self._push(self.hands, self.hand_head, self.hand_count, slot, abs(lw.y - rw.y), self.hist_len)
+
+    # -------------------- FEATURES --------------------
+    def _ordered(self, buf, head, count, slots):
+        # значения в хронологическом порядке, как в deque
+        idx = (head[slots, None] - count[slots, None] + np.arange(buf.shape[1])) % buf.shape[1]
+        return buf[slots[:, None], idx]
+
+    def _reduce(self, buf, head, count, slots, fn, min_len):
+        """
+        fn по истории каждого трека. Треки группируются по длине истории:
+        порядок суммирования тот же, что у np.mean/np.std на deque.
+        """
+        out = np.zeros(len(slots))
+        ordered = self._ordered(buf, head, count, slots)
+        counts = count[slots]
+        for n in np.unique(counts):
+            if n < min_len:
+                continue
+            rows = counts == n
+            out[rows] = fn(np.ascontiguousarray(ordered[rows, :n]), axis=1)
+        return out
+
+    def features(self, slots):
+        """Скорость, активность рук и вертикальное движение для всех slots."""
+        slots = np.asarray(slots, dtype=np.int64)
+        speed = self._reduce(self.speeds, self.speed_head, self.speed_count, slots, np.mean, 1)
+        hands = self._reduce(self.hands, self.hand_head, self.hand_count, slots, np.std, 2)
+
+        vert = np.zeros(len(slots))
+        has = self.pos_count[slots] >= 2
+        if has.any():
+            s = slots[has]
+            last = self.positions[s, (self.pos_head[s] - 1) % self.pos_len, 1]
+            prev = self.positions[s, (self.pos_head[s] - 2) % self.pos_len, 1]
+            vert[has] = prev - last
+        return speed, hands, vert
+
+    # -------------------- ACTION + INTENT --------------------
+    def detect(self, slots, poses):
+        """
+        Действие и намерение для всех треков сразу.
+        Возвращает список (action, action_conf, intent, intent_conf).
+        """
+        if not len(slots):
+            return []
+        speed, hands, vert = self.features(slots)
+        ls, rs, lw, rw, nose = np.array(
+            [[pose[i].y for i in POSE_POINTS] for pose in poses], dtype=np.float64
+        ).T
+
+        absent = -np.inf
+        run = np.minimum(speed / 8, 0.9)
+        scores = np.stack([
+            np.where(speed < 1.5, 0.9, absent),
+            np.where((1.5 <= speed) & (speed < 4), 0.7, absent),
+            np.where((speed >= 4.5) & (hands < 0.015), run, absent),
+            np.where((hands > 0.03) & (speed < 3), 0.8, absent),
+            np.where((np.abs(lw - rw) < 0.03) & (hands > 0.04), 0.9, absent),
+            np.where((lw < ls) & (rw < rs), 0.85, absent),
+            np.where(nose > (ls + rs) / 2, 0.7, absent),
+            np.where((vert > 6) & (speed > 3), 0.9, absent),
+            np.where(~((vert > 6) & (speed > 3)) & (vert > 3), 0.6, absent),
+            np.where((speed > 2) | (hands > 0.02), 0.6, absent),
+        ], axis=1)
+        # argmax берёт первый максимум — как max() по словарю в порядке вставки
+        best = np.argmax(scores, axis=1)
+        any_score = np.isfinite(scores.max(axis=1))
+
+        intent_idx = np.select([speed < 1.5, vert > 3, speed > 3], [0, 1, 2], default=3)
+
+        results = []
+        for i, slot in enumerate(slots):
+            last = self.last_action[slot]
+            if not any_score[i]:
+                action, conf = last, 0.4
+            else:
+                action = ACTIONS[best[i]]
+                # min(speed / 8, 0.9) в IntentPredictor даёт numpy-скаляр
+                conf = run[i] if best[i] == 2 and speed[i] / 8 <= 0.9 else float(scores[i, best[i]])
+
+            # защита от резких скачков
+            if action != last and conf < 0.65:
+                action = last
+                conf *= 0.9
+
+            self.last_action[slot] = action
+            results.append((
+                action, round(min(conf, 0.95), 2),
+                INTENTS[intent_idx[i]], INTENT_CONF[intent_idx[i]]
+            ))
+        return results
@@ -0,0 +1,160 @@
+import asyncio
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+
+# ---------- ЗАДАЧИ ВОРКЕРА ----------
+# модели грузятся только внутри воркеров, один раз на процесс,
+# а процесс бота остаётся лёгким.
+WORKER_MODELS = ("detector", "pose", "emotion", "hands")
+VIDEO_MAX_SIDE = int(os.environ.get("AI_VIDEO_MAX_SIDE", "1280"))
+
+
+def _init_worker():
+    import models
+    times = models.warmup(*WORKER_MODELS)
+    print(f"Воркер {os.getpid()} готов: " + ", ".join(f"{k} {v:.2f} с" for k, v in times.items()))
+
+
+def _ping():
+    return os.getpid()
+
+
+def run_image_bytes(data):
+    from process_media import process_image_bytes
+    return process_image_bytes(data)
+
+
+class _Progress:
+    """
+    Прогресс из воркера в общий словарь менеджера.
+    Запись — межпроцессный вызов, поэтому не чаще раза в interval секунд.
+    """
+
+    def __init__(self, state, interval=0.5):
+        self.state = state
+        self.interval = interval
+        self.last = 0.0
+
+    def __call__(self, done, total):
+        now = time.monotonic()
+        if now - self.last < self.interval and done != total:
+            return
+        self.last = now
+        self.state.update(done=done, total=total)
+
+
+def run_video(input_path, output_path, progress=None, cancel=None):
+    """Возвращает output_path или None, если задачу отменили."""
+    from process_media import Cancelled, process_video
+    try:
+        # H.264 до 1280 по длинной стороне: меньше файл и быстрее загрузка в Telegram
+        process_video(
+            input_path, output_path, max_side=VIDEO_MAX_SIDE,
+            progress=_Progress(progress) if progress is not None else None,
+            cancel=cancel
+        )
+    except Cancelled:
+        return None
+    return output_path
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    """
+    Очередь задач бота поверх пула процессов.
+    Ограничивает число одновременных задач всего (workers)
+    и на одного пользователя (per_user); обработчики только ждут результат.
+    """
+
+    def __init__(self, workers=None, per_user=1, max_pending=32):
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.per_user = per_user
+        self.max_pending = max_pending
+
+        self.executor = self._make_executor()
+        self.global_limit = None
+        self.user_limits = {}  # uid -> семафор; живёт, пока у пользователя есть задачи
+        self.user_jobs = {}    # uid -> сколько задач ждут или выполняются
+        self.pending = 0
+        self.manager = None  # общие Event/dict для отмены и прогресса
+
+    def _make_executor(self):
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=mp.get_context("spawn"),  # без fork-а состояния TF/MediaPipe
+            initializer=_init_worker
+        )
+
+    def _prestart(self):
+        for _ in range(self.workers):
+            self.executor.submit(_ping)
+
+    def _restart(self, broken):
+        """
+        Воркер упал (OOM, segfault) — пул сломан навсегда; создаём новый
+        и заново прогреваем модели. Несколько задач могут заметить поломку
+        одновременно — пересоздаётся только тот пул, на котором они упали.
+        """
+        if self.executor is not broken:
+            return
+        print("⚠️ Пул воркеров сломан (процесс упал), перезапускаю")
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.executor = self._make_executor()
+        self._prestart()
+
+    def start(self):
+        """Поднимает все воркеры заранее, чтобы первая задача не ждала загрузки моделей."""
+        self._prestart()
+        self.manager = mp.get_context("spawn").Manager()
+
+    def control(self):
+        """
+        Токен отмены и словарь прогресса {"done", "total"} для одной задачи;
+        оба передаются в воркер и видны из бота.
+        """
+        return self.manager.Event(), self.manager.dict(done=0, total=0)
+
+    def is_full(self):
+        return self.pending >= self.max_pending
+
+    async def run(self, uid, fn, *args):
+        if self.is_full():
+            raise QueueFull()
+
+        if self.global_limit is None:
+            self.global_limit = asyncio.Semaphore(self.workers)
+        user_limit = self.user_limits.setdefault(uid, asyncio.Semaphore(self.per_user))
+        self.user_jobs[uid] = self.user_jobs.get(uid, 0) + 1
+
+        self.pending += 1
+        try:
+            async with user_limit:
+                async with self.global_limit:
+                    loop = asyncio.get_running_loop()
+                    executor = self.executor
+                    try:
+                        return await loop.run_in_executor(executor, partial(fn, *args))
+                    except BrokenProcessPool:
+                        # эта задача пропала вместе с воркером; следующие пойдут в новый пул
+                        self._restart(executor)
+                        raise
+        finally:
+            self.pending -= 1
+            # последняя задача пользователя — семафор больше никто не ждёт
+            self.user_jobs[uid] -= 1
+            if not self.user_jobs[uid]:
+                del self.user_jobs[uid]
+                del self.user_limits[uid]
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.manager is not None:
+            self.manager.shutdown()
@@ -1,19 +1,41 @@
+import argparse
+import threading
+import time
+
 import cv2
-from detector import PersonDetector
-from pose import PoseEstimator
-from intent_predictor import IntentPredictor
-from emotion import EmotionRecognizer
-from hand_gesture import HandGestureRecognizer
-from draw import draw_text
+import models
+from emotion import EmotionCache
+from tracker import PersonTracker
+from draw import OverlayRenderer, draw_text
+from process_media import analyze_frame, emotion_label
+from metrics import STATS
+from detector import ResolutionController
+from video_io import LatestFrameCapture
+
+# ==================== ПАРАМЕТРЫ ====================
+parser = argparse.ArgumentParser()
+parser.add_argument("--imgsz", type=int, default=640,
+                    help="разрешение детектора (длинная сторона); с --target-fps "
+                         "используются шаги 320/416/512/640, другое значение округляется вниз до шага")
+parser.add_argument("--target-fps", type=float, default=None,
+                    help="держать FPS, автоматически меняя разрешение детектора")
+parser.add_argument("--source", default="0",
+                    help="номер камеры или путь к видеофайлу (читается в темпе его FPS)")
+args = parser.parse_args()
 
 # ==================== ИНИЦИАЛИЗАЦИЯ ====================
-cap = cv2.VideoCapture(0)
+is_camera = args.source.isdigit()
+cap = cv2.VideoCapture(int(args.source) if is_camera else args.source)
+capture = LatestFrameCapture(cap, realtime=not is_camera)
+
+detector = models.get("detector")
+detector.imgsz = args.imgsz
+resolution = ResolutionController(detector, args.target_fps) if args.target_fps else None
 
-detector = PersonDetector()
-pose_estimator = PoseEstimator()
-intent_model = IntentPredictor()
-emotion_model = EmotionRecognizer()
-hand_gesture_model = HandGestureRecognizer()
+models.warmup("detector", "pose", "emotion", "hands")
+tracker = PersonTracker()
+emotion_cache = EmotionCache()
+renderer = OverlayRenderer()
 
 # ==================== ОКНО FULLSCREEN ====================
 WINDOW_NAME = "AI Human Understanding"
@@ -24,85 +46,78 @@ cv2.setWindowProperty(
     cv2.WINDOW_FULLSCREEN
 )
 
-# ==================== ОСНОВНОЙ ЦИКЛ ====================
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    h_frame, w_frame, _ = frame.shape
-    boxes = detector.detect(frame)
-
-    for box in boxes:
-        x1, y1, x2, y2 = map(int, box)
-        x1, y1 = max(0, x1), max(0, y1)
-        x2, y2 = min(w_frame, x2), min(h_frame, y2)
-
-        person = frame[y1:y2, x1:x2]
-        if person.size < 500:
-            continue
-
-        # ==================== ПОЗА ====================
-        pose = pose_estimator.estimate(person)
-        if pose is None:
-            continue
-
-        # ==================== ЖЕСТЫ РУК ====================
-        gesture_text = "жест: —"
-        gesture_prob = 0.0
-
-        try:
-            gesture, g_prob = hand_gesture_model.recognize(person)
-            if gesture != "нет жеста":
-                gesture_text = f"жест: {gesture} ({int(g_prob * 100)}%)"
-                gesture_prob = g_prob
-        except Exception as e:
-            gesture_text = "жест: ошибка"
-
-        # ==================== ЭМОЦИИ ====================
-        emotion_text = "эмоция: —"
-        face_box = pose_estimator.detect_face(person)
-
-        if face_box:
-            fx1, fy1, fx2, fy2 = map(int, face_box)
-            fx1, fy1 = max(0, fx1), max(0, fy1)
-            fx2, fy2 = min(person.shape[1], fx2), min(person.shape[0], fy2)
-
-            face = person[fy1:fy2, fx1:fx2]
-
-            if face.size > 500:
-                try:
-                    emo, emo_prob = emotion_model.predict(face)
-                    emotion_text = f"эмоция: {emo} ({int(emo_prob * 100)}%)"
-                except Exception:
-                    emotion_text = "эмоция: ошибка"
-            else:
-                emotion_text = "эмоция: мало лицо"
-
-        # ==================== ДЕЙСТВИЯ + НАМЕРЕНИЕ ====================
-        intent_model.update(box, pose)
-
-        action, action_prob = intent_model.detect_action(pose)
-        intent, intent_prob = intent_model.detect_intent(pose)
+# ==================== ПОТОК ИНФЕРЕНСА ====================
+# Захват, инференс и показ не ждут друг друга: инференс берёт самый
+# свежий кадр, окно показывает последний кадр с последним результатом.
+result_lock = threading.Lock()
+latest_people = []
+inference_done = threading.Event()
+
+
+def inference_loop():
+    global latest_people
+    try:
+        while True:
+            item = capture.take()
+            if item is None:
+                break
+            _, frame, captured_at = item
+
+            # поза, жесты (ROI рук), эмоции и намерения — общий конвейер с ботом
+            t0 = time.perf_counter()
+            people = analyze_frame(frame, tracker, emotion_cache)
+            now = time.perf_counter()
+            if resolution is not None:
+                resolution.update(now - t0)
+            if STATS.enabled:
+                STATS.record("latency", now - captured_at)
+
+            with result_lock:
+                latest_people = people
+    finally:
+        inference_done.set()
+
+
+capture.start()
+inference = threading.Thread(target=inference_loop, daemon=True)
+inference.start()
+
+# ==================== ОСНОВНОЙ ЦИКЛ (ПОКАЗ) ====================
+shown_seq = 0
+while not inference_done.is_set():
+    seq, frame = capture.latest()
+    if frame is None or seq == shown_seq:
+        if cv2.waitKey(1) & 0xFF in (27, ord("q")):
+            break
+        continue
+    shown_seq = seq
+    frame = frame.copy()  # тот же кадр может сейчас анализироваться
+
+    with result_lock:
+        people = latest_people
+
+    # ==================== ОТРИСОВКА (ОДИН ПРОХОД) ====================
+    for p in people:
+        x1, y1, x2, y2 = p["box"]
+        action, action_prob = p["action"]
+        intent, intent_prob = p["intent"]
+        gesture, gesture_prob = p["gesture"]
 
         # ==================== ВЫБОР ГЛАВНОГО ТЕКСТА ====================
         if gesture_prob > action_prob:
-            main_text = gesture_text
+            main_text = f"жест: {gesture} ({int(gesture_prob * 100)}%)"
         else:
             main_text = f"действие: {action} ({int(action_prob * 100)}%)"
 
-        # ==================== ОТРИСОВКА ====================
-        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        renderer.rect((x1, y1), (x2, y2))
 
-        frame = draw_text(
-            frame,
+        renderer.text(
             main_text,
             (x1, max(30, y1 - 80)),
             34
         )
 
-        frame = draw_text(
-            frame,
+        renderer.text(
             f"намерение: {intent} ({int(intent_prob * 100)}%)",
             (x1, max(30, y1 - 45)),
             30
@@ -112,13 +127,23 @@ while True:
         emotion_x = max(5, x2 - 150)   # 220px — безопасная ширина под текст
         emotion_y = max(5, y1 - 30 )
 
-        frame = draw_text(
-            frame,
-            emotion_text,
+        renderer.text(
+            emotion_label(p["emotion"]),
             (emotion_x, emotion_y),
             28
         )
 
+    with STATS.stage("draw"):
+        frame = renderer.render(frame)
+
+    # ==================== FPS / ЗАДЕРЖКИ СТАДИЙ ====================
+    # меняются каждый кадр: без кэша спрайтов и вне замера стадии draw
+    if STATS.enabled:
+        lines = STATS.overlay_lines()
+        counts = capture.stats()
+        lines.append(f"кадров: {counts['processed']} / пропущено: {counts['dropped']}")
+        for i, line in enumerate(lines):
+            draw_text(frame, line, (10, 25 + i * 24), 20, cache=False)
 
     cv2.imshow(WINDOW_NAME, frame)
 
@@ -126,5 +151,11 @@ while True:
         break
 
 # ==================== ЗАВЕРШЕНИЕ ====================
+capture.stop()
+inference.join()
+print(f"Кадры: {capture.stats()}")
+print(f"Кэш эмоций: {emotion_cache.stats()}")
+if STATS.enabled:
+    print(STATS.prometheus())
 cap.release()
 cv2.destroyAllWindows()
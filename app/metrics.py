@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+import numpy as np
+
+STAGES = ("detect", "pose", "face", "emotion", "gesture", "intent", "draw", "encode")
+
+_NULL = nullcontext()
+
+
+class _Timer:
+    __slots__ = ("stats", "name", "t0")
+
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.record(self.name, time.perf_counter() - self.t0)
+        return False
+
+
+class Stats:
+    """
+    Таймеры стадий и счётчики кадров.
+    Выключенная статистика отдаёт общий пустой контекст — накладные
+    расходы на стадию сводятся к одной проверке флага.
+    Выгрузка: snapshot() (dict), prometheus() (текст) и JSON lines.
+    """
+
+    def __init__(self, enabled=False, window=300, jsonl_path=None, log_every=100):
+        self.enabled = enabled
+        self.window = window
+        self.jsonl_path = jsonl_path
+        self.log_every = log_every
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.samples = {}
+        self.totals = {}
+        self.counts = {}
+        self.frames = 0
+        self.people = deque(maxlen=self.window)
+        self.frame_times = deque(maxlen=self.window)
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL
+        return _Timer(self, name)
+
+    def record(self, name, seconds):
+        with self.lock:
+            if name not in self.samples:
+                self.samples[name] = deque(maxlen=self.window)
+                self.totals[name] = 0.0
+                self.counts[name] = 0
+            self.samples[name].append(seconds)
+            self.totals[name] += seconds
+            self.counts[name] += 1
+
+    def frame(self, people):
+        """Отмечает конец кадра и число людей в нём."""
+        if not self.enabled:
+            return
+        with self.lock:
+            self.frames += 1
+            self.people.append(people)
+            self.frame_times.append(time.perf_counter())
+        if self.jsonl_path and self.frames % self.log_every == 0:
+            self.write_jsonl()
+
+    # -------------------- ВЫГРУЗКА --------------------
+    def fps(self):
+        if len(self.frame_times) < 2:
+            return 0.0
+        span = self.frame_times[-1] - self.frame_times[0]
+        return (len(self.frame_times) - 1) / span if span > 0 else 0.0
+
+    def snapshot(self):
+        with self.lock:
+            stages = {}
+            for name, samples in self.samples.items():
+                arr = np.asarray(samples) * 1000
+                stages[name] = {
+                    "count": self.counts[name],
+                    "total_s": round(self.totals[name], 4),
+                    "p50_ms": round(float(np.percentile(arr, 50)), 3),
+                    "p95_ms": round(float(np.percentile(arr, 95)), 3),
+                    "last_ms": round(float(arr[-1]), 3)
+                }
+            people = list(self.people)
+        return {
+            "time": time.time(),
+            "frames": self.frames,
+            "fps": round(self.fps(), 2),
+            "people_mean": round(float(np.mean(people)), 2) if people else 0.0,
+            "people_last": people[-1] if people else 0,
+            "stages": stages
+        }
+
+    def prometheus(self, prefix="ai_human"):
+        snap = self.snapshot()
+        lines = [
+            f"# TYPE {prefix}_frames_total counter",
+            f"{prefix}_frames_total {snap['frames']}",
+            f"# TYPE {prefix}_fps gauge",
+            f"{prefix}_fps {snap['fps']}",
+            f"# TYPE {prefix}_people gauge",
+            f"{prefix}_people {snap['people_last']}",
+            f"# TYPE {prefix}_stage_seconds summary"
+        ]
+        for name, st in snap["stages"].items():
+            lines += [
+                f'{prefix}_stage_seconds{{stage="{name}",quantile="0.5"}} {st["p50_ms"] / 1000:.6f}',
+                f'{prefix}_stage_seconds{{stage="{name}",quantile="0.95"}} {st["p95_ms"] / 1000:.6f}',
+                f'{prefix}_stage_seconds_sum{{stage="{name}"}} {st["total_s"]:.6f}',
+                f'{prefix}_stage_seconds_count{{stage="{name}"}} {st["count"]}'
+            ]
+        return "\n".join(lines) + "\n"
+
+    def write_jsonl(self, path=None):
+        with open(path or self.jsonl_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.snapshot(), ensure_ascii=False) + "\n")
+
+    def overlay_lines(self):
+        """Короткие строки для вывода поверх живого окна."""
+        snap = self.snapshot()
+        lines = [f"FPS: {snap['fps']:.1f}  людей: {snap['people_last']}"]
+        for name in STAGES:
+            st = snap["stages"].get(name)
+            if st is not None:
+                lines.append(f"{name}: {st['p50_ms']:.1f} мс")
+        return lines
+
+
+# общий объект статистики процесса; включается переменной окружения
+STATS = Stats(
+    enabled=os.environ.get("AI_METRICS") == "1" or bool(os.environ.get("AI_METRICS_JSONL")),
+    jsonl_path=os.environ.get("AI_METRICS_JSONL")
+)
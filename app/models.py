@@ -0,0 +1,107 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+
+class ModelRegistry:
+    """
+    Ленивый реестр моделей: каждая модель создаётся при первом обращении
+    и живёт одна на процесс. warmup() грузит модели заранее и делает
+    пробный прогон, load_times хранит время загрузки каждой модели.
+    """
+
+    def __init__(self):
+        self.factories = {}
+        self.warmups = {}
+        self.instances = {}
+        self.load_times = {}
+        self.lock = threading.Lock()
+
+    def register(self, name, factory, warmup=None):
+        self.factories[name] = factory
+        if warmup is not None:
+            self.warmups[name] = warmup
+
+    def get(self, name):
+        model = self.instances.get(name)
+        if model is not None:
+            return model
+
+        with self.lock:
+            model = self.instances.get(name)
+            if model is None:
+                t0 = time.perf_counter()
+                model = self.factories[name]()
+                self.load_times[name] = time.perf_counter() - t0
+                self.instances[name] = model
+                print(f"Модель {name} загружена за {self.load_times[name]:.2f} с")
+        return model
+
+    def is_loaded(self, name):
+        return name in self.instances
+
+    def warmup(self, *names):
+        """
+        Загружает модели и прогоняет пустой кадр, чтобы первый
+        настоящий запрос не платил за инициализацию.
+        """
+        for name in names or list(self.factories):
+            model = self.get(name)
+            fn = self.warmups.get(name)
+            if fn is None:
+                continue
+            t0 = time.perf_counter()
+            try:
+                fn(model)
+            except Exception as e:
+                print(f"Предупреждение: прогрев {name} не удался ({e})")
+            self.load_times[f"{name}:warmup"] = time.perf_counter() - t0
+        return dict(self.load_times)
+
+
+# ---------- МОДЕЛИ ПРОЕКТА ----------
+# импорты внутри фабрик: тяжёлые библиотеки грузятся только при первом обращении
+
+def _detector():
+    from detector import PersonDetector
+    # AI_DETECTOR_BACKEND: torch / onnx / openvino, AI_DETECTOR_INT8=1 — квантизованная модель
+    return PersonDetector(
+        backend=os.environ.get("AI_DETECTOR_BACKEND", "torch"),
+        int8=os.environ.get("AI_DETECTOR_INT8") == "1"
+    )
+
+
+def _pose():
+    from pose import PoseEstimator
+    return PoseEstimator()
+
+
+def _emotion():
+    from emotion import EmotionRecognizer
+    return EmotionRecognizer()
+
+
+def _hands():
+    from hand_gesture import HandGestureRecognizer
+    return HandGestureRecognizer()
+
+
+def _dummy(h, w):
+    return np.zeros((h, w, 3), dtype=np.uint8)
+
+
+registry = ModelRegistry()
+registry.register("detector", _detector, lambda m: m.detect(_dummy(640, 640)))
+registry.register("pose", _pose, lambda m: m.estimate(_dummy(256, 256)))
+registry.register("emotion", _emotion, lambda m: m.predict_batch([_dummy(64, 64)]))
+registry.register("hands", _hands, lambda m: m.detect_batch([_dummy(160, 160)]))
+
+
+def get(name):
+    return registry.get(name)
+
+
+def warmup(*names):
+    return registry.warmup(*names)
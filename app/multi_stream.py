@@ -0,0 +1,179 @@
+import argparse
+import math
+import os
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+import models
+from emotion import EmotionCache
+from metrics import STATS
+from process_media import analyze_frame, render_frame
+from tracker import PersonTracker
+from video_io import LatestFrameCapture
+
+
+def open_source(source):
+    """
+    Камера (номер), видеофайл или сетевой поток (rtsp://, http://).
+    Возвращает (cap, realtime): локальный файл читается в темпе своего FPS,
+    как камера.
+    """
+    if str(source).isdigit():
+        return cv2.VideoCapture(int(source)), False
+    return cv2.VideoCapture(source), os.path.exists(source)
+
+
+class Stream:
+    """Один источник: свой поток захвата, трекер, кэш эмоций и FPS."""
+
+    def __init__(self, source, window=30):
+        self.source = source
+        cap, realtime = open_source(source)
+        if not cap.isOpened():
+            raise RuntimeError(f"Не удалось открыть источник: {source}")
+        self.capture = LatestFrameCapture(cap, realtime=realtime)
+
+        # -------- состояние трекинга и намерений — своё у каждого потока --------
+        self.tracker = PersonTracker()
+        self.emotion_cache = EmotionCache()
+
+        self.frame = None
+        self.people = []
+        self.tile = None  # последний отрисованный кадр для сетки
+        self.times = deque(maxlen=window)
+
+    def fps(self):
+        if len(self.times) < 2:
+            return 0.0
+        span = self.times[-1] - self.times[0]
+        return (len(self.times) - 1) / span if span > 0 else 0.0
+
+
+class MultiStreamRunner:
+    """
+    Несколько камер / файлов / RTSP на одном наборе моделей.
+    Каждый такт берёт свежие кадры готовых потоков (не больше max_batch,
+    по кругу — чтобы при перегрузе ни один поток не голодал), ищет людей
+    одним вызовом detect_batch, а трекинг, эмоции и намерения считает
+    по состоянию своего потока.
+    """
+
+    def __init__(self, sources, max_batch=None, show=True, cell=(640, 360), report_every=5.0):
+        self.streams = [Stream(s) for s in sources]
+        self.max_batch = max_batch or len(self.streams)
+        self.show = show
+        self.cell = cell
+        self.report_every = report_every
+        self.next_start = 0  # с какого потока начинать следующий такт
+
+    # -------------------- ТАКТ --------------------
+    def ready(self):
+        """Потоки с новым кадром, по кругу от next_start."""
+        n = len(self.streams)
+        batch = []
+        for i in range(n):
+            idx = (self.next_start + i) % n
+            item = self.streams[idx].capture.poll()
+            if item is None:
+                continue
+            self.streams[idx].frame = item[1]
+            batch.append(self.streams[idx])
+            if len(batch) >= self.max_batch:
+                # следующий такт начнётся с потока после последнего взятого
+                self.next_start = (idx + 1) % n
+                break
+        return batch
+
+    def tick(self):
+        """Один такт; возвращает число обработанных потоков."""
+        batch = self.ready()
+        if not batch:
+            return 0
+
+        with STATS.stage("detect"):
+            boxes_list = models.get("detector").detect_batch([s.frame for s in batch])
+
+        now = time.perf_counter()
+        for stream, boxes in zip(batch, boxes_list):
+            stream.people = analyze_frame(stream.frame, stream.tracker, stream.emotion_cache, boxes=boxes)
+            stream.times.append(now)
+            if self.show:
+                # копия: тот же массив лежит в захвате
+                frame = render_frame(stream.frame.copy(), stream.people)
+                stream.tile = cv2.resize(frame, self.cell, interpolation=cv2.INTER_AREA)
+        return len(batch)
+
+    # -------------------- ВЫВОД --------------------
+    def grid(self):
+        """Все потоки одной картинкой: сетка с подписями FPS."""
+        cw, ch = self.cell
+        cols = math.ceil(math.sqrt(len(self.streams)))
+        rows = math.ceil(len(self.streams) / cols)
+        canvas = np.zeros((rows * ch, cols * cw, 3), dtype=np.uint8)
+        for i, stream in enumerate(self.streams):
+            if stream.tile is None:
+                continue
+            tile = stream.tile.copy()
+            cv2.putText(tile, f"{i}: {stream.fps():.1f} FPS", (10, 25),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+            r, c = divmod(i, cols)
+            canvas[r * ch:(r + 1) * ch, c * cw:(c + 1) * cw] = tile
+        return canvas
+
+    def report(self):
+        for i, stream in enumerate(self.streams):
+            counts = stream.capture.stats()
+            print(
+                f"[{i}] {stream.source}: {stream.fps():.1f} FPS, людей {len(stream.people)}, "
+                f"кадров {counts['processed']}, пропущено {counts['dropped']}"
+            )
+
+    # -------------------- ЗАПУСК --------------------
+    def run(self):
+        for stream in self.streams:
+            stream.capture.start()
+
+        last_report = time.perf_counter()
+        try:
+            while not all(s.capture.exhausted() for s in self.streams):
+                processed = self.tick()
+                if not processed and not self.show:
+                    time.sleep(0.002)  # ни у одного потока нет нового кадра
+
+                if self.show:
+                    if processed:
+                        cv2.imshow("AI Human Understanding", self.grid())
+                    if cv2.waitKey(1) & 0xFF in (27, ord("q")):
+                        break
+
+                if time.perf_counter() - last_report >= self.report_every:
+                    self.report()
+                    last_report = time.perf_counter()
+        finally:
+            for stream in self.streams:
+                stream.capture.stop()
+                stream.capture.cap.release()
+            if self.show:
+                cv2.destroyAllWindows()
+        self.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Несколько камер / видео / RTSP на одних моделях")
+    parser.add_argument("sources", nargs="+", help="номер камеры, путь к видео или URL потока")
+    parser.add_argument("--max-batch", type=int, default=None,
+                        help="сколько потоков максимум за такт (по умолчанию все)")
+    parser.add_argument("--headless", action="store_true", help="без окна, только FPS в консоль")
+    parser.add_argument("--imgsz", type=int, default=640, help="разрешение детектора (длинная сторона)")
+    args = parser.parse_args()
+
+    models.get("detector").imgsz = args.imgsz
+    models.warmup("detector", "pose", "emotion", "hands")
+    MultiStreamRunner(args.sources, max_batch=args.max_batch, show=not args.headless).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import multiprocessing as mp
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from encoder import ffmpeg_exe, open_writer
+
+# IntentPredictor хранит 25 последних позиций — столько же кадров прогрева
+WARMUP_FRAMES = 25
+
+
+def _process_segment(input_path, segment_path, start, end, warmup, kwargs):
+    # модели создаются реестром лениво — свои в каждом процессе
+    from process_media import process_video
+    process_video(input_path, segment_path, start=start, end=end, warmup=warmup, **kwargs)
+    return segment_path
+
+
+def stitch_segments(segments, output_path, fps):
+    """
+    Склеивает отрезки в один файл: ffmpeg concat без перекодирования,
+    если ffmpeg доступен, иначе перекодирование через cv2.
+    """
+    ffmpeg = ffmpeg_exe()
+    if ffmpeg:
+        list_path = output_path + ".txt"
+        with open(list_path, "w") as f:
+            for seg in segments:
+                f.write(f"file '{os.path.abspath(seg)}'\n")
+        try:
+            subprocess.run(
+                [ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                 "-i", list_path, "-c", "copy", output_path],
+                check=True
+            )
+            return
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"Предупреждение: ffmpeg concat не сработал ({e}). Склеиваем через cv2.")
+        finally:
+            os.remove(list_path)
+
+    out = None
+    try:
+        for seg in segments:
+            cap = cv2.VideoCapture(seg)
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if out is None:
+                    # отрезки могли быть уменьшены (max_side) — размер по первому кадру
+                    out = open_writer(output_path, fps, frame.shape[1::-1], encoder="cv2")
+                out.write(frame)
+            cap.release()
+    finally:
+        if out is not None:
+            out.release()
+
+
+def process_video_parallel(input_path, output_path, workers=None,
+                           warmup=WARMUP_FRAMES, min_segment_frames=100, **kwargs):
+    """
+    Делит видео на отрезки по времени и обрабатывает их в отдельных процессах
+    (у каждого свои модели), затем склеивает результат.
+    Каждый отрезок начинается с warmup кадров прогрева без записи,
+    чтобы трекер и IntentPredictor на стыке были уже заполнены.
+    Остальные аргументы передаются в process_video.
+    """
+    cap = cv2.VideoCapture(input_path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+
+    workers = workers or os.cpu_count() or 1
+    n = max(1, min(workers, total // max(1, min_segment_frames)))
+    if n == 1:
+        from process_media import process_video
+        process_video(input_path, output_path, **kwargs)
+        return
+
+    bounds = [round(i * total / n) for i in range(n + 1)]
+    ext = os.path.splitext(output_path)[1] or ".mp4"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with ProcessPoolExecutor(max_workers=n, mp_context=mp.get_context("spawn")) as pool:
+            futures = [
+                pool.submit(
+                    _process_segment, input_path, os.path.join(tmp, f"seg_{i:03d}{ext}"),
+                    # последний отрезок — до конца файла: число кадров лишь оценка
+                    bounds[i], bounds[i + 1] if i < n - 1 else None, warmup if i else 0, kwargs
+                )
+                for i in range(n)
+            ]
+            segments = [f.result() for f in futures]
+
+        stitch_segments(segments, output_path, fps)
@@ -1,5 +1,6 @@
 import mediapipe as mp
 import cv2
+import numpy as np
 
 class PoseEstimator:
     def __init__(self):
@@ -13,16 +14,19 @@ class PoseEstimator:
             min_detection_confidence=0.4  # Пониженный порог для лучшей детекции
         )
 
-    def estimate(self, frame):
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        result = self.pose.process(rgb)
+    def estimate(self, frame, rgb=None):
+        # rgb — уже сконвертированный кадр из FrameContext
+        if rgb is None:
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        result = self.pose.process(np.ascontiguousarray(rgb))
         if not result.pose_landmarks:
             return None
         return result.pose_landmarks.landmark
 
-    def detect_face(self, frame):
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        result = self.face.process(rgb)
+    def detect_face(self, frame, rgb=None):
+        if rgb is None:
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        result = self.face.process(np.ascontiguousarray(rgb))
         if not result.detections:
             return None
         det = result.detections[0]
@@ -34,4 +38,39 @@ class PoseEstimator:
         y2 = int(min(1, bbox.ymin + bbox.height) * h)
         if x2 <= x1 or y2 <= y1:
             return None
-        return x1, y1, x2, y2
\ No newline at end of file
+        return x1, y1, x2, y2
+
+    def face_from_landmarks(self, landmarks, shape, min_visibility=0.5, padding=1.2):
+        """
+        Бокс лица по точкам позы 0-10 (нос, глаза, уши, рот) без второй сети.
+        Возвращает None, если точки лица видны плохо.
+        """
+        face = landmarks[:11]
+        visible = [lm for lm in face if lm.visibility >= min_visibility]
+        if face[0].visibility < min_visibility or len(visible) < 5:
+            return None
+
+        h, w = shape[:2]
+        xs = [lm.x * w for lm in visible]
+        ys = [lm.y * h for lm in visible]
+        cx = (min(xs) + max(xs)) / 2
+        cy = (min(ys) + max(ys)) / 2
+
+        # точки лица занимают полосу глаза-рот: лицо выше неё примерно в 2.5 раза
+        side = max(max(xs) - min(xs), 2.5 * (max(ys) - min(ys))) * padding
+        x1 = int(max(0, cx - side / 2))
+        y1 = int(max(0, cy - side / 2))
+        x2 = int(min(w, cx + side / 2))
+        y2 = int(min(h, cy + side / 2))
+        if x2 <= x1 or y2 <= y1:
+            return None
+        return x1, y1, x2, y2
+
+    def locate_face(self, frame, landmarks, rgb=None):
+        """
+        Лицо по точкам позы; FaceDetection — только если точки не видны.
+        """
+        box = self.face_from_landmarks(landmarks, frame.shape)
+        if box is None:
+            return self.detect_face(frame, rgb)
+        return box
@@ -1,96 +1,406 @@
+import math
+import time
+
 import cv2
-from detector import PersonDetector
-from pose import PoseEstimator
-from intent_predictor import IntentPredictor
-from emotion import EmotionRecognizer
-from draw import draw_text
-
-detector = PersonDetector()
-pose_estimator = PoseEstimator()
-intent_model = IntentPredictor()
-emotion_model = EmotionRecognizer()
-
-def process_frame(frame):
-    h, w, _ = frame.shape
-    boxes = detector.detect(frame)
-
-    for box in boxes:
-        x1, y1, x2, y2 = [int(c) for c in box]
-        x1, y1 = max(0, x1), max(0, y1)
-        x2, y2 = min(w, x2), min(h, y2)
-
-        person = frame[y1:y2, x1:x2]
+import numpy as np
+import models
+from emotion import EmotionCache
+from frame_context import FrameContext
+from metrics import STATS
+from tracker import PersonTracker
+from draw import OverlayRenderer
+from encoder import open_writer
+from video_io import FrameReader, FrameWriter
+
+# модели берутся из реестра при первом использовании
+renderer = OverlayRenderer()
+
+def analyze_frame(frame, tracker=None, emotion_cache=None, gap=1, boxes=None, gestures=True):
+    """
+    Полный расчёт кадра: детекция, трекинг, поза, жесты, эмоции, действия.
+    gap — сколько кадров прошло с прошлого анализа (для шага > 1),
+    boxes — уже найденные боксы людей (пакетная детекция),
+    gestures — искать жесты в ROI рук по точкам запястий.
+    Возвращает список людей для отрисовки.
+    """
+    # без трекера кадр считается одиночным (фото)
+    if tracker is None:
+        tracker = PersonTracker()
+    if emotion_cache is not None:
+        emotion_cache.next_frame()
+
+    pose_estimator = models.get("pose")
+
+    ctx = FrameContext(frame)
+    if boxes is None:
+        with STATS.stage("detect"):
+            boxes = models.get("detector").detect(frame)
+
+    people = []
+    faces = []  # лица кадра для пакетного распознавания эмоций
+    face_keys = []  # (трек, бокс лица в кадре) для записи в кэш
+    hands = []  # RGB-вырезки рук кадра и индекс их владельца в people
+
+    for track, box in tracker.update(boxes):
+        x1, y1, x2, y2 = ctx.clip(box)
+        person = ctx.crop(box)  # срез без копирования
         if person.size == 0:
             continue
 
-        pose = pose_estimator.estimate(person)
+        # -------- кэш трека: человек почти не двигался --------
+        face_idx = None
+        if tracker.is_stable(track, box):
+            pose = track.cache["pose"]
+            emotion = track.cache["emotion"]
+            gesture = track.cache["gesture"]
+        else:
+            with STATS.stage("pose"):
+                pose = pose_estimator.estimate(person, ctx.crop_rgb(box))
+
+            # -------- лицо (эмоция считается позже, пачкой) --------
+            emotion = (None, 0.0)
+            if pose is not None:
+                with STATS.stage("face"):
+                    face_box = pose_estimator.locate_face(person, pose, ctx.crop_rgb(box))
+                if face_box:
+                    fx1, fy1, fx2, fy2 = [int(c) for c in face_box]
+                    face = person[fy1:fy2, fx1:fx2]
+                    if face.size > 400:
+                        face_key = (track.id, (x1+fx1, y1+fy1, x1+fx2, y1+fy2))
+                        cached = None
+                        if emotion_cache is not None:
+                            cached = emotion_cache.get(*face_key, face)
+                        if cached is not None:
+                            emotion = cached
+                        else:
+                            face_idx = len(faces)
+                            faces.append(face)
+                            face_keys.append(face_key)
+
+            # -------- руки: ROI вокруг запястий, жесты позже, пачкой --------
+            gesture = (None, 0.0)
+            if gestures and pose is not None:
+                for hx1, hy1, hx2, hy2 in models.get("hands").hand_rois(pose, person.shape):
+                    hands.append((ctx.crop_rgb((x1+hx1, y1+hy1, x1+hx2, y1+hy2)), len(people)))
+
+            track.remember(box, pose=pose, emotion=emotion, gesture=gesture)
+
         if pose is None:
             continue
 
-        # -------- эмоции --------
-        emotion_text = "эмоция: —"
-        face_box = pose_estimator.detect_face(person)
-        if face_box:
-            fx1, fy1, fx2, fy2 = [int(c) for c in face_box]
-            face = person[fy1:fy2, fx1:fx2]
-            if face.size > 400:
-                emo, emo_prob = emotion_model.predict(face)
-                emotion_text = f"эмоция: {emo} ({int(emo_prob*100)}%)"
-
         # -------- действия --------
-        intent_model.update(box, pose)
-        action, action_prob = intent_model.detect_action(pose)
-        intent, intent_prob = intent_model.detect_intent(pose)
-
-        # -------- отрисовка --------
-        cv2.rectangle(frame, (x1,y1), (x2,y2), (0,255,0), 2)
-        frame = draw_text(
-            frame,
-            f"действие: {action} ({int(action_prob*100)}%)",
+        with STATS.stage("intent"):
+            tracker.intents.update(track.slot, box, pose, gap)
+
+        people.append({
+            "track": track,
+            "box": (x1, y1, x2, y2),
+            "pose": pose,
+            "gesture": gesture,
+            "emotion": emotion,
+            "face_idx": face_idx
+        })
+
+    # -------- действия и намерения: все треки одним векторным вызовом --------
+    with STATS.stage("intent"):
+        intents = tracker.intents.detect(
+            [p["track"].slot for p in people], [p["pose"] for p in people]
+        )
+    for p, (action, action_prob, intent, intent_prob) in zip(people, intents):
+        p["action"] = (action, action_prob)
+        p["intent"] = (intent, intent_prob)
+
+    # -------- эмоции: один прогон на все лица кадра --------
+    emotions = []
+    if faces:
+        with STATS.stage("emotion"):
+            emotions = models.get("emotion").predict_batch(faces)
+    if emotion_cache is not None:
+        for (track_id, face_box), face, result in zip(face_keys, faces, emotions):
+            emotion_cache.put(track_id, face_box, face, result)
+    for p in people:
+        if p["face_idx"] is not None:
+            p["emotion"] = emotions[p["face_idx"]]
+            p["track"].cache["emotion"] = p["emotion"]
+
+    # -------- жесты: все руки кадра одной мозаикой --------
+    if hands:
+        with STATS.stage("gesture"):
+            results = models.get("hands").detect_batch([roi for roi, _ in hands])
+        for (_, owner), result in zip(hands, results):
+            p = people[owner]
+            if result[1] > p["gesture"][1]:
+                p["gesture"] = result
+                p["track"].cache["gesture"] = result
+
+    STATS.frame(len(people))
+    return people
+
+
+def emotion_label(emotion):
+    emo, emo_prob = emotion
+    if emo is None:
+        return "эмоция: —"
+    return f"эмоция: {emo} ({int(emo_prob*100)}%)"
+
+
+def to_records(people, frame_idx=0, interpolated=False):
+    """
+    Компактные записи для аналитики: одна плоская запись на человека
+    (поля — export.RECORD_FIELDS).
+    """
+    records = []
+    for p in people:
+        x1, y1, x2, y2 = p["box"]
+        records.append({
+            "frame": frame_idx,
+            "track": p["track"].id,
+            "x1": x1, "y1": y1, "x2": x2, "y2": y2,
+            "action": p["action"][0], "action_prob": float(p["action"][1]),
+            "intent": p["intent"][0], "intent_prob": float(p["intent"][1]),
+            "emotion": p["emotion"][0] or "", "emotion_prob": float(p["emotion"][1]),
+            "gesture": p["gesture"][0] or "", "gesture_prob": float(p["gesture"][1]),
+            "interpolated": interpolated
+        })
+    return records
+
+
+def render_frame(frame, people):
+    """Рисует результат analyze_frame поверх кадра."""
+    h = frame.shape[0]
+
+    # -------- отрисовка (один проход на кадр) --------
+    for p in people:
+        x1, y1, x2, y2 = p["box"]
+        action, action_prob = p["action"]
+        gesture, gesture_prob = p["gesture"]
+        if gesture_prob > action_prob:
+            main_text = f"жест: {gesture} ({int(gesture_prob*100)}%)"
+        else:
+            main_text = f"действие: {action} ({int(action_prob*100)}%)"
+
+        renderer.rect((x1,y1), (x2,y2))
+        renderer.text(
+            main_text,
             (x1, max(20, y1-60)),
             28
         )
-        frame = draw_text(
-            frame,
-            f"намерение: {intent}",
+        renderer.text(
+            f"намерение: {p['intent'][0]}",
             (x1, max(20, y1-30)),
             24
         )
-        frame = draw_text(
-            frame,
-            emotion_text,
+        renderer.text(
+            emotion_label(p["emotion"]),
             (x1, min(h-20, y2+25)),
             24
         )
 
-    return frame
+    with STATS.stage("draw"):
+        return renderer.render(frame)
+
+
+def process_frame(frame, tracker=None, emotion_cache=None):
+    people = analyze_frame(frame, tracker, emotion_cache)
+    return render_frame(frame, people)
+
+
+def _interpolate_people(prev, nxt, t):
+    """
+    Боксы между двумя ключевыми кадрами: линейная интерполяция по треку,
+    подписи переносятся с предыдущего ключевого кадра.
+    """
+    nxt_boxes = {p["track"].id: p["box"] for p in nxt}
+    out = []
+    for p in prev:
+        box = p["box"]
+        target = nxt_boxes.get(p["track"].id)
+        if target is not None:
+            box = tuple(int(round(a + (b - a) * t)) for a, b in zip(box, target))
+        out.append(dict(p, box=box))
+    return out
 
 
-def process_image(input_path, output_path):
+def _motion(small, ref):
+    if ref is None:
+        return float("inf")
+    return float(cv2.absdiff(small, ref).mean())
+
+
+def process_image_bytes(data, ext=".jpg"):
+    """
+    Фото целиком в памяти: закодированные байты на входе и на выходе,
+    без временных файлов.
+    """
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Не удалось декодировать изображение")
+    ok, buf = cv2.imencode(ext, process_frame(img))
+    if not ok:
+        raise ValueError(f"Не удалось закодировать изображение в {ext}")
+    return buf.tobytes()
+
+
+def analyze_image(input_path):
+    """Только анализ фото, без отрисовки: список записей to_records."""
     img = cv2.imread(input_path)
-    out = process_frame(img)
-    cv2.imwrite(output_path, out)
+    return to_records(analyze_frame(img))
+
+
+class Cancelled(Exception):
+    pass
 
 
-def process_video(input_path, output_path):
+def process_video(input_path, output_path, stride=1, time_budget=None,
+                  motion_threshold=None, max_stride=10, batch_size=4,
+                  start=0, end=None, warmup=0, sink=None,
+                  encoder="auto", max_side=None, bitrate=None,
+                  progress=None, cancel=None):
+    """
+    Обработка видео. Полный стек моделей запускается только на ключевых кадрах:
+    каждый stride-й кадр или кадр, где движение больше motion_threshold
+    (средняя разница яркости уменьшенного кадра, 0-255).
+    time_budget (сек на всё видео) подбирает шаг автоматически по замеренному
+    времени анализа. Промежуточные кадры получают интерполированные боксы
+    и подписи с последнего ключевого кадра.
+    Люди на ключевых кадрах ищутся пачками по batch_size кадров.
+    start/end — обрабатываемый отрезок кадров [start, end); warmup кадров
+    перед start прогоняются без записи, чтобы прогреть трекер и намерения.
+    sink — приёмник записей to_records (см. export); при output_path=None
+    видео не рисуется и не кодируется.
+    encoder/max_side/bitrate — кодировщик и ограничения выхода (см. encoder.open_writer).
+    progress(done, total) вызывается после каждого готового кадра (total=0 —
+    длина неизвестна). cancel — объект с is_set() (threading/multiprocessing
+    Event): проверяется на каждом кадре, при отмене — исключение Cancelled.
+    """
     cap = cv2.VideoCapture(input_path)
     w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     fps = cap.get(cv2.CAP_PROP_FPS)
+    # CAP_PROP_FRAME_COUNT — лишь оценка (без nb_frames это длительность×FPS),
+    # поэтому она идёт только в прогресс и бюджет времени; без явного end
+    # кадры читаются до конца файла
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    last = end if end is not None else (total if total > 0 else None)
+    expected = max(0, last - start) if last is not None else 0
 
-    out = cv2.VideoWriter(
-        output_path,
-        cv2.VideoWriter_fourcc(*"mp4v"),
-        fps,
-        (w, h)
-    )
+    # свой трекер на каждое видео: состояние не смешивается между файлами
+    tracker = PersonTracker()
+    emotion_cache = EmotionCache()
 
-    while True:
+    # -------- прогрев состояния перед отрезком --------
+    warm_from = max(0, start - warmup)
+    if warm_from:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, warm_from)
+    for _ in range(start - warm_from):
+        if cancel is not None and cancel.is_set():
+            cap.release()
+            raise Cancelled()
         ret, frame = cap.read()
         if not ret:
             break
-        frame = process_frame(frame)
-        out.write(frame)
+        analyze_frame(frame, tracker, emotion_cache)
+
+    # декодирование -> инференс -> кодирование: три стадии на очередях
+    reader = FrameReader(cap, limit=None if end is None else end - start)
+    writer = None
+    if output_path is not None:
+        writer = FrameWriter(open_writer(
+            output_path, fps, (w, h),
+            encoder=encoder, max_side=max_side, bitrate=bitrate
+        ))
+        writer.start()
+    reader.start()
+
+    prev_people = None
+    pending = []  # (номер, кадр) после последнего ключевого
+    chunk = []    # (промежуточные, номер, ключевой кадр) для пакетной детекции
+    ref_small = None
+    analyzed = 0
+    analyze_time = 0.0
+    started = time.perf_counter()
+    done = 0
+
+    def check_cancel():
+        if cancel is not None and cancel.is_set():
+            raise Cancelled()
+
+    def emit(frame, people, idx, interpolated=False):
+        nonlocal done
+        if sink is not None:
+            sink.write(to_records(people, start + idx, interpolated))
+        if writer is not None:
+            writer.write(render_frame(frame, people))
+        done += 1
+        if progress is not None:
+            progress(done, max(expected, done) if expected else 0)
+
+    def flush():
+        nonlocal prev_people, analyzed, analyze_time
+        t0 = time.perf_counter()
+        with STATS.stage("detect"):
+            boxes_list = models.get("detector").detect_batch([frame for _, _, frame in chunk])
+        for (mids, idx, frame), boxes in zip(chunk, boxes_list):
+            check_cancel()
+            people = analyze_frame(frame, tracker, emotion_cache, gap=len(mids) + 1, boxes=boxes)
+            if prev_people is None:
+                prev_people = people
+            for i, (mid_idx, mid) in enumerate(mids):
+                t = (i + 1) / (len(mids) + 1)
+                emit(mid, _interpolate_people(prev_people, people, t), mid_idx, True)
+            emit(frame, people, idx)
+            prev_people = people
+        analyze_time += time.perf_counter() - t0
+        analyzed += len(chunk)
+        chunk.clear()
+
+    try:
+        for idx, frame in enumerate(reader):
+            check_cancel()
+            small = cv2.cvtColor(cv2.resize(frame, (64, 36)), cv2.COLOR_BGR2GRAY)
+
+            # -------- шаг по бюджету времени --------
+            if time_budget is not None and analyzed:
+                left = max(time_budget - (time.perf_counter() - started), 1e-3)
+                cost = analyze_time / analyzed
+                remaining = max(1, expected - idx) if expected else 1
+                stride = min(max_stride, max(1, math.ceil(remaining * cost / left)))
+
+            is_key = (
+                ref_small is None
+                or len(pending) + 1 >= stride
+                or (motion_threshold is not None and _motion(small, ref_small) > motion_threshold)
+            )
+            if not is_key:
+                # без вывода видео сами промежуточные кадры не нужны
+                pending.append((idx, frame if writer is not None else None))
+                continue
+
+            chunk.append((pending, idx, frame))
+            pending = []
+            ref_small = small
+            if len(chunk) >= batch_size:
+                flush()
+
+        if chunk:
+            flush()
+
+        # хвост после последнего ключевого кадра — подписи без интерполяции
+        for mid_idx, mid in pending:
+            emit(mid, prev_people or [], mid_idx, True)
+    finally:
+        reader.stop()
+        if writer is not None:
+            writer.close()
+        cap.release()
+
 
-    cap.release()
-    out.release()
+def analyze_video(input_path, sink, **kwargs):
+    """
+    Только аналитика по видео: записи уходят в sink (JSONL/CSV/NumPy),
+    без отрисовки и кодирования. kwargs — как у process_video.
+    """
+    try:
+        process_video(input_path, None, sink=sink, **kwargs)
+    finally:
+        sink.close()
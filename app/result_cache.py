@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from collections import OrderedDict
+
+
+def sha256_file(path, chunk=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResultCache:
+    """
+    Дисковый кэш готовых результатов бота.
+    Ключи — строки вида "photo:<file_unique_id>" или "video:sha256:<хэш>";
+    несколько ключей могут указывать на один сохранённый файл.
+    Размер ограничен max_bytes, вытесняется давно не использованный файл (LRU).
+    Индекс лежит рядом в index.json и переживает перезапуск бота.
+    """
+
+    def __init__(self, root, max_bytes=512 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(root, "index.json")
+        os.makedirs(root, exist_ok=True)
+
+        self.keys = {}              # ключ -> имя файла
+        self.files = OrderedDict()  # имя файла -> {"size", "source_size", "keys"}, от старых к новым
+        self.total = 0
+
+        # -------- статистика --------
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+        self._load()
+
+    # -------------------- ИНДЕКС --------------------
+    def _load(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            print("⚠️ Индекс кэша результатов повреждён, начинаю с пустого")
+            return
+        for name, entry in data.get("files", []):
+            if not os.path.exists(os.path.join(self.root, name)):
+                continue
+            self.files[name] = entry
+            self.total += entry["size"]
+            for key in entry["keys"]:
+                self.keys[key] = name
+
+    def _save(self):
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"files": list(self.files.items())}, f)
+        os.replace(tmp, self.index_path)
+
+    # -------------------- ЧТЕНИЕ --------------------
+    def get(self, *keys, downloaded=False, count_miss=True):
+        """
+        Путь к сохранённому результату по первому найденному ключу или None.
+        Ключи-None пропускаются; найденный файл получает все переданные ключи.
+        downloaded=True — исходник уже скачан (поиск по хэшу содержимого),
+        сэкономлен только инференс. count_miss=False — промах не последний,
+        дальше будет поиск по другому ключу.
+        """
+        keys = [k for k in keys if k]
+        name = next((self.keys[k] for k in keys if k in self.keys), None)
+        if name is None:
+            if count_miss:
+                self.misses += 1
+                self.log()
+            return None
+
+        entry = self.files[name]
+        self.files.move_to_end(name)
+        # индекс переписывается, только если появились новые ключи;
+        # порядок LRU на диске обновится при следующей записи
+        if self._link(name, keys):
+            self._save()
+
+        self.hits += 1
+        if not downloaded:
+            self.bytes_saved += entry["source_size"]
+        self.log()
+        return os.path.join(self.root, name)
+
+    # -------------------- ЗАПИСЬ --------------------
+    def put_file(self, keys, path, source_size=0, move=False):
+        """
+        Кладёт готовый файл в кэш под всеми ключами; возвращает путь в кэше.
+        move=True — перенос вместо копирования (временный файл больше не нужен).
+        """
+        name = self._name(path)
+        if move:
+            shutil.move(path, os.path.join(self.root, name))
+        else:
+            shutil.copyfile(path, os.path.join(self.root, name))
+        return self._store(name, keys, source_size)
+
+    def put_bytes(self, keys, data, ext, source_size=0):
+        name = self._name(ext)
+        with open(os.path.join(self.root, name), "wb") as f:
+            f.write(data)
+        return self._store(name, keys, source_size)
+
+    def _name(self, path_or_ext):
+        ext = os.path.splitext(path_or_ext)[1] or path_or_ext
+        return f"{time.time_ns():x}{ext}"
+
+    def _store(self, name, keys, source_size):
+        size = os.path.getsize(os.path.join(self.root, name))
+        self.files[name] = {"size": size, "source_size": source_size, "keys": []}
+        self.total += size
+        self._link(name, [k for k in keys if k])
+        self._evict(keep=name)
+        self._save()
+        return os.path.join(self.root, name)
+
+    def _link(self, name, keys):
+        """Привязывает ключи к файлу; True, если что-то изменилось."""
+        changed = False
+        for key in keys:
+            old = self.keys.get(key)
+            if old == name:
+                continue
+            if old is not None:
+                self.files[old]["keys"].remove(key)
+            self.keys[key] = name
+            self.files[name]["keys"].append(key)
+            changed = True
+        return changed
+
+    def _evict(self, keep):
+        while self.total > self.max_bytes and len(self.files) > 1:
+            name = next(iter(self.files))
+            if name == keep:
+                break
+            entry = self.files.pop(name)
+            self.total -= entry["size"]
+            for key in entry["keys"]:
+                self.keys.pop(key, None)
+            try:
+                os.remove(os.path.join(self.root, name))
+            except FileNotFoundError:
+                pass
+
+    # -------------------- СТАТИСТИКА --------------------
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "files": len(self.files),
+            "bytes": self.total
+        }
+
+    def log(self):
+        st = self.stats()
+        print(
+            f"Кэш результатов: попаданий {st['hits']}/{st['hits'] + st['misses']} "
+            f"({st['hit_rate'] * 100:.0f}%), сэкономлено {st['bytes_saved'] / 1e6:.1f} МБ, "
+            f"занято {st['bytes'] / 1e6:.1f} МБ в {st['files']} файлах"
+        )
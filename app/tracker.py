@@ -0,0 +1,176 @@
+import numpy as np
+
+from intent_predictor import IntentBank
+
+
+def iou_matrix(a, b):
+    """
+    IoU между двумя наборами боксов (x1, y1, x2, y2).
+    Возвращает матрицу формы (len(a), len(b)).
+    """
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+
+    ix1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    iy1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    ix2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    iy2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return inter / np.maximum(union, 1e-6)
+
+
+class KalmanBoxFilter:
+    """
+    Фильтр Калмана с постоянной скоростью для бокса.
+    Состояние: (cx, cy, w, h, vx, vy, vw, vh).
+    """
+
+    def __init__(self, box):
+        x1, y1, x2, y2 = box
+        self.x = np.array(
+            [(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1, 0, 0, 0, 0],
+            dtype=np.float64
+        )
+        self.P = np.diag([10, 10, 10, 10, 1e3, 1e3, 1e3, 1e3]).astype(np.float64)
+
+        self.F = np.eye(8)
+        self.F[:4, 4:] = np.eye(4)
+        self.H = np.eye(4, 8)
+        self.Q = np.diag([1, 1, 1, 1, 0.01, 0.01, 0.01, 0.01])
+        self.R = np.diag([1, 1, 10, 10]).astype(np.float64)
+
+    def predict(self):
+        self.x = self.F @ self.x
+        self.P = self.F @ self.P @ self.F.T + self.Q
+        return self.box()
+
+    def update(self, box):
+        x1, y1, x2, y2 = box
+        z = np.array([(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1])
+        y = z - self.H @ self.x
+        S = self.H @ self.P @ self.H.T + self.R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ y
+        self.P = (np.eye(8) - K @ self.H) @ self.P
+
+    def box(self):
+        cx, cy, w, h = self.x[:4]
+        return cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2
+
+
+class Track:
+    """
+    Один человек в кадре: свой фильтр Калмана, свой слот в IntentBank
+    и кэш дорогих результатов (поза, лицо, эмоция).
+    """
+
+    def __init__(self, track_id, box, slot):
+        self.id = track_id
+        self.kf = KalmanBoxFilter(box)
+        self.slot = slot  # строка состояния намерений в PersonTracker.intents
+        self.box = box
+        self.hits = 1
+        self.time_since_update = 0
+
+        # -------- кэш результатов --------
+        self.cache = {}
+        self.cache_box = None
+        self.cache_age = 0
+
+    def predict(self):
+        self.time_since_update += 1
+        return self.kf.predict()
+
+    def update(self, box):
+        self.kf.update(box)
+        self.box = box
+        self.hits += 1
+        self.time_since_update = 0
+
+    # -------------------- КЭШ --------------------
+    def is_stable(self, box, min_iou, max_reuse):
+        """
+        True, если человек почти не сдвинулся с момента последнего
+        полного расчёта и кэш ещё можно переиспользовать.
+        """
+        if self.cache_box is None or self.cache_age >= max_reuse:
+            return False
+        if iou_matrix([box], [self.cache_box])[0, 0] < min_iou:
+            return False
+        self.cache_age += 1
+        return True
+
+    def remember(self, box, **results):
+        self.cache = results
+        self.cache_box = box
+        self.cache_age = 0
+
+
+class PersonTracker:
+    """
+    Трекер людей в стиле SORT/ByteTrack: предсказание Калманом,
+    жадное сопоставление по IoU, удаление устаревших треков.
+    Состояние намерений всех треков хранится в одном IntentBank.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_age=30, stable_iou=0.9, max_reuse=5):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.stable_iou = stable_iou
+        self.max_reuse = max_reuse
+        self.tracks = []
+        self.intents = IntentBank()
+        self._next_id = 1
+
+    def update(self, boxes):
+        """
+        Сопоставляет боксы детектора с треками.
+        Возвращает список (track, box) в порядке входных боксов.
+        """
+        boxes = [tuple(int(c) for c in b) for b in boxes]
+        predicted = [t.predict() for t in self.tracks]
+
+        iou = iou_matrix(predicted, boxes)
+        assigned = [None] * len(boxes)
+        used_tracks = set()
+
+        # жадное сопоставление: сначала самые уверенные пары
+        if iou.size:
+            order = np.dstack(np.unravel_index(np.argsort(-iou, axis=None), iou.shape))[0]
+            for ti, di in order:
+                if iou[ti, di] < self.iou_threshold:
+                    break
+                if ti in used_tracks or assigned[di] is not None:
+                    continue
+                track = self.tracks[ti]
+                track.update(boxes[di])
+                assigned[di] = track
+                used_tracks.add(ti)
+
+        # новые треки для несопоставленных детекций
+        for di, box in enumerate(boxes):
+            if assigned[di] is None:
+                track = Track(self._next_id, box, self.intents.add())
+                self._next_id += 1
+                self.tracks.append(track)
+                assigned[di] = track
+
+        # удаляем потерянные треки
+        alive = []
+        for t in self.tracks:
+            if t.time_since_update <= self.max_age:
+                alive.append(t)
+            else:
+                self.intents.release(t.slot)
+        self.tracks = alive
+
+        return list(zip(assigned, boxes))
+
+    def is_stable(self, track, box):
+        return track.is_stable(box, self.stable_iou, self.max_reuse)
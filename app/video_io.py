@@ -0,0 +1,197 @@
+import queue
+import threading
+import time
+
+import cv2
+
+from metrics import STATS
+
+_END = object()
+
+
+class FrameReader(threading.Thread):
+    """
+    Поток декодирования: читает кадры из cv2.VideoCapture
+    в ограниченную очередь (backpressure при медленном инференсе).
+    """
+
+    def __init__(self, cap, maxsize=8, limit=None):
+        super().__init__(daemon=True)
+        self.cap = cap
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.limit = limit  # сколько кадров прочитать (None — до конца)
+        self.stopped = threading.Event()
+
+    def run(self):
+        read = 0
+        try:
+            while not self.stopped.is_set():
+                if self.limit is not None and read >= self.limit:
+                    break
+                read += 1
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                self._put(frame)
+        finally:
+            self._put(_END, force=True)
+
+    def _put(self, item, force=False):
+        while force or not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if force and self.stopped.is_set():
+                    return
+
+    def __iter__(self):
+        while True:
+            frame = self.queue.get()
+            if frame is _END:
+                return
+            yield frame
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class FrameWriter(threading.Thread):
+    """
+    Поток кодирования: пишет кадры в cv2.VideoWriter в порядке поступления.
+    write() блокируется, если кодировщик не успевает.
+    """
+
+    def __init__(self, writer, maxsize=8):
+        super().__init__(daemon=True)
+        self.writer = writer
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.error = None
+
+    def run(self):
+        while True:
+            frame = self.queue.get()
+            if frame is _END:
+                break
+            if self.error is not None:
+                continue
+            try:
+                with STATS.stage("encode"):
+                    self.writer.write(frame)
+            except Exception as e:
+                self.error = e
+
+    def write(self, frame):
+        if self.error is not None:
+            raise self.error
+        self.queue.put(frame)
+
+    def close(self):
+        self.queue.put(_END)
+        self.join()
+        self.writer.release()
+        if self.error is not None:
+            raise self.error
+
+
+class LatestFrameCapture(threading.Thread):
+    """
+    Поток захвата для живого режима: держит только самый свежий кадр.
+    Если инференс не успевает, старые кадры выбрасываются (drop-old),
+    поэтому задержка не больше одного инференса, а не длины очереди.
+    realtime=True — читать видеофайл в темпе его FPS, как камеру.
+    """
+
+    def __init__(self, cap, realtime=False):
+        super().__init__(daemon=True)
+        self.cap = cap
+        self.fps = cap.get(cv2.CAP_PROP_FPS) if realtime else 0
+        self.cond = threading.Condition()
+        self.stopped = threading.Event()
+        self.ended = False
+
+        self.frame = None
+        self.seq = 0             # номер последнего захваченного кадра
+        self.captured_at = 0.0
+        self.taken_seq = 0       # последний кадр, отданный инференсу
+
+        # -------- счётчики --------
+        self.captured = 0
+        self.processed = 0
+        self.dropped = 0
+
+    def run(self):
+        started = time.perf_counter()
+        try:
+            while not self.stopped.is_set():
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                with self.cond:
+                    if self.frame is not None and self.taken_seq < self.seq:
+                        self.dropped += 1
+                    self.seq += 1
+                    self.captured += 1
+                    self.frame = frame
+                    self.captured_at = time.perf_counter()
+                    self.cond.notify_all()
+
+                if self.fps > 0:
+                    delay = started + self.seq / self.fps - time.perf_counter()
+                    if delay > 0:
+                        self.stopped.wait(delay)
+        finally:
+            with self.cond:
+                self.ended = True
+                self.cond.notify_all()
+
+    def take(self, timeout=1.0):
+        """
+        Самый свежий ещё не обработанный кадр для инференса:
+        (seq, кадр, время захвата). None — источник закончился.
+        """
+        with self.cond:
+            while self.taken_seq >= self.seq:
+                if self.ended or self.stopped.is_set():
+                    return None
+                self.cond.wait(timeout)
+            self.taken_seq = self.seq
+            self.processed += 1
+            return self.seq, self.frame, self.captured_at
+
+    def poll(self):
+        """
+        Как take(), но без ожидания: None, если нового кадра пока нет
+        (конец источника — exhausted()).
+        """
+        with self.cond:
+            if self.taken_seq >= self.seq:
+                return None
+            self.taken_seq = self.seq
+            self.processed += 1
+            return self.seq, self.frame, self.captured_at
+
+    def exhausted(self):
+        """Источник закончился и последний кадр уже отдан."""
+        with self.cond:
+            return self.ended and self.taken_seq >= self.seq
+
+    def latest(self):
+        """Последний кадр для показа, без отметки об обработке."""
+        with self.cond:
+            return self.seq, self.frame
+
+    def stats(self):
+        with self.cond:
+            return {
+                "captured": self.captured,
+                "processed": self.processed,
+                "dropped": self.dropped
+            }
+
+    def stop(self):
+        self.stopped.set()
+        with self.cond:
+            self.cond.notify_all()
+        self.join()
@@ -0,0 +1,106 @@
+"""
+Бенчмарк PersonDetector на CPU.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_detector.py --frames 64
+    python benchmarks/bench_detector.py --backends torch,onnx,onnx-int8,openvino
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+os.chdir(ROOT)  # кэш экспортированных моделей — models/detector
+
+from detector import PersonDetector  # noqa: E402
+from tracker import iou_matrix  # noqa: E402
+
+SAMPLE = os.path.join(ROOT, "bot_data", "5233739541_input.jpg")
+
+
+def bench(detector, frames, batch_size):
+    # прогрев
+    detector.detect_batch(frames[:batch_size])
+
+    start = time.perf_counter()
+    for i in range(0, len(frames), batch_size):
+        detector.detect_batch(frames[i:i + batch_size])
+    return len(frames) / (time.perf_counter() - start)
+
+
+def latency(detector, frames):
+    detector.detect(frames[0])
+    times = []
+    for frame in frames:
+        t0 = time.perf_counter()
+        detector.detect(frame)
+        times.append((time.perf_counter() - t0) * 1000)
+    return float(np.percentile(times, 50)), float(np.percentile(times, 95))
+
+
+def agreement(reference, boxes, thr=0.5):
+    """F1 совпадения боксов с эталоном (PyTorch) при IoU >= thr."""
+    if len(reference) == 0 and len(boxes) == 0:
+        return 1.0
+    if len(reference) == 0 or len(boxes) == 0:
+        return 0.0
+    iou = iou_matrix(reference, boxes)
+    matched = 0
+    while iou.size and iou.max() >= thr:
+        i, j = np.unravel_index(np.argmax(iou), iou.shape)
+        matched += 1
+        iou[i, :] = 0
+        iou[:, j] = 0
+    return 2 * matched / (len(reference) + len(boxes))
+
+
+def batch_sizes(args, frames):
+    detector = PersonDetector()
+    base = None
+    print(f"{'batch':>6} {'fps':>8} {'speedup':>8}")
+    for bs in [int(b) for b in args.batch_sizes.split(",")]:
+        fps = bench(detector, frames, bs)
+        base = base or fps
+        print(f"{bs:>6} {fps:>8.2f} {fps / base:>7.2f}x")
+
+
+def backends(args, frames):
+    reference = None
+    print(f"{'backend':>14} {'p50 мс':>8} {'p95 мс':>8} {'F1 vs torch':>12}")
+    for name in ["torch"] + [b for b in args.backends.split(",") if b != "torch"]:
+        backend, _, variant = name.partition("-")
+        detector = PersonDetector(backend=backend, int8=variant == "int8")
+        p50, p95 = latency(detector, frames)
+        boxes = [detector.detect_batch([f])[0] for f in frames]
+        if reference is None:
+            reference = boxes
+        f1 = np.mean([agreement(r, b) for r, b in zip(reference, boxes)])
+        print(f"{name:>14} {p50:>8.2f} {p95:>8.2f} {f1:>12.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=64)
+    parser.add_argument("--image", default=SAMPLE)
+    parser.add_argument("--batch-sizes", default="1,4,8,16")
+    parser.add_argument("--backends", default=None,
+                        help="сравнить бэкенды, например torch,onnx,onnx-int8,openvino")
+    args = parser.parse_args()
+
+    img = cv2.imread(args.image)
+    # лёгкие сдвиги, чтобы кадры отличались
+    frames = [np.roll(img, i * 3, axis=1) for i in range(args.frames)]
+
+    if args.backends:
+        backends(args, frames)
+    else:
+        batch_sizes(args, frames)
+
+
+if __name__ == "__main__":
+    main()
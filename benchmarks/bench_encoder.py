@@ -0,0 +1,118 @@
+"""
+Бенчмарк кодировщиков видео: время кодирования и размер файла.
+cv2 mp4v (прежний вариант) против H.264 через ffmpeg с разными пресетами
+и ограничением разрешения / битрейта.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_encoder.py --frames 150
+    python benchmarks/bench_encoder.py --video clip.mp4 --out encoder.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+
+from encoder import ffmpeg_exe, open_writer  # noqa: E402
+
+SAMPLE = os.path.join(ROOT, "bot_data", "5233739541_input.jpg")
+
+# (название, параметры open_writer)
+CONFIGS = [
+    ("cv2 mp4v", {"encoder": "cv2"}),
+    ("x264 ultrafast", {"encoder": "ffmpeg", "preset": "ultrafast"}),
+    ("x264 veryfast", {"encoder": "ffmpeg", "preset": "veryfast"}),
+    ("x264 veryfast 1280", {"encoder": "ffmpeg", "preset": "veryfast", "max_side": 1280}),
+    ("x264 veryfast 720 2M", {"encoder": "ffmpeg", "preset": "veryfast", "max_side": 720, "bitrate": "2M"}),
+]
+
+
+def load_frames(args):
+    if args.video:
+        cap = cv2.VideoCapture(args.video)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25
+        frames = []
+        while len(frames) < args.frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+        return frames, fps
+
+    img = cv2.resize(cv2.imread(args.image), (args.width, args.height))
+    # сдвиг и подписи — как у обработанного видео с рамками и текстом
+    frames = []
+    for i in range(args.frames):
+        frame = np.roll(img, i * 4, axis=1)
+        cv2.rectangle(frame, (100 + i, 100), (500 + i, 900), (0, 255, 0), 2)
+        cv2.putText(frame, f"frame {i}", (100, 80), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (255, 255, 255), 2)
+        frames.append(frame)
+    return frames, 25
+
+
+def bench(frames, fps, params, tmp):
+    path = os.path.join(tmp, "out.mp4")
+    h, w = frames[0].shape[:2]
+    t0 = time.perf_counter()
+    writer = open_writer(path, fps, (w, h), **params)
+    for frame in frames:
+        writer.write(frame)
+    writer.release()
+    elapsed = time.perf_counter() - t0
+
+    size = os.path.getsize(path)
+    cap = cv2.VideoCapture(path)
+    out_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    cap.release()
+    os.remove(path)
+    return {
+        "seconds": round(elapsed, 3),
+        "fps": round(len(frames) / elapsed, 1),
+        "size_mb": round(size / 1e6, 3),
+        "output": f"{out_size[0]}x{out_size[1]}"
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=150)
+    parser.add_argument("--image", default=SAMPLE)
+    parser.add_argument("--video", default=None, help="взять кадры из видео вместо синтетики")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--out", default=None, help="сохранить результат в JSON")
+    args = parser.parse_args()
+
+    frames, fps = load_frames(args)
+    h, w = frames[0].shape[:2]
+    print(f"{len(frames)} кадров {w}x{h}, ffmpeg: {ffmpeg_exe() or 'не найден'}")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, params in CONFIGS:
+            if params["encoder"] == "ffmpeg" and not ffmpeg_exe():
+                continue
+            results[name] = bench(frames, fps, params, tmp)
+
+    base = results.get("cv2 mp4v")
+    print(f"{'кодировщик':>22} {'сек':>7} {'FPS':>7} {'МБ':>8} {'размер':>10}")
+    for name, r in results.items():
+        ratio = f" ({r['size_mb'] / base['size_mb']:.2f}x)" if base and base["size_mb"] else ""
+        print(f"{name:>22} {r['seconds']:>7.2f} {r['fps']:>7.1f} {r['size_mb']:>8.2f} {r['output']:>10}{ratio}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"frames": len(frames), "input": f"{w}x{h}", "results": results},
+                      f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
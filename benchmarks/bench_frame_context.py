@@ -0,0 +1,93 @@
+"""
+Сколько памяти выделяется на кадр при конвертации цвета:
+отдельный cvtColor в каждой стадии против общего FrameContext.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_frame_context.py --people 5
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+
+from frame_context import FrameContext  # noqa: E402
+
+STAGES = 3  # поза, лицо, руки
+
+
+def synthetic(people, w=1920, h=1080, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 255, (h, w, 3), dtype=np.uint8)
+    boxes = []
+    for i in range(people):
+        x1 = int(i * w / people)
+        boxes.append((x1, 200, x1 + int(w / people * 0.8), 1000))
+    return frame, boxes
+
+
+def per_stage(frame, boxes):
+    for x1, y1, x2, y2 in boxes:
+        person = frame[y1:y2, x1:x2]
+        for _ in range(STAGES):
+            cv2.cvtColor(person, cv2.COLOR_BGR2RGB)
+
+
+def shared(frame, boxes):
+    ctx = FrameContext(frame)
+    for box in boxes:
+        ctx.crop(box)
+        for _ in range(STAGES):
+            ctx.crop_rgb(box)
+
+
+def measure(fn, frame, boxes, repeats):
+    # пик памяти numpy/cv2 за один кадр
+    tracemalloc.start()
+    fn(frame, boxes)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # число и объём буферов, созданных конвертацией
+    sizes = []
+    orig = cv2.cvtColor
+
+    def counting(*a, **k):
+        out = orig(*a, **k)
+        sizes.append(out.nbytes)
+        return out
+
+    cv2.cvtColor = counting
+    try:
+        fn(frame, boxes)
+    finally:
+        cv2.cvtColor = orig
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(frame, boxes)
+    ms = (time.perf_counter() - start) / repeats * 1000
+    return {"allocs": len(sizes), "bytes": sum(sizes), "peak": peak, "ms": ms}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--people", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    frame, boxes = synthetic(args.people)
+    for name, fn in [("per-stage cvtColor", per_stage), ("FrameContext", shared)]:
+        r = measure(fn, frame, boxes, args.repeats)
+        print(f"{name:>20}: {r['allocs']:3d} конвертаций, "
+              f"{r['bytes'] / 1e6:7.2f} МБ, пик {r['peak'] / 1e6:7.2f} МБ, {r['ms']:6.2f} мс/кадр")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Бенчмарк стадий конвейера на CPU: p50/p95 задержки по стадиям,
+FPS process_frame / process_video и пиковый RSS. Результат — JSON.
+
+Запуск из корня репозитория:
+    python benchmarks/run_benchmarks.py --out bench.json
+    python benchmarks/run_benchmarks.py --compare old.json new.json
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+os.chdir(ROOT)  # FONT_PATH и пути моделей заданы от корня
+
+import models  # noqa: E402
+from draw import OverlayRenderer, draw_text  # noqa: E402
+from intent_predictor import IntentPredictor  # noqa: E402
+from process_media import process_frame, process_video  # noqa: E402
+from tracker import PersonTracker  # noqa: E402
+
+
+# -------------------- ДАННЫЕ --------------------
+def sample_images():
+    paths = sorted(glob.glob(os.path.join(ROOT, "bot_data", "*_input.jpg")))
+    return [(os.path.basename(p), cv2.imread(p)) for p in paths]
+
+
+def synthetic_frame(sources, people, w=1280, h=720, seed=0):
+    """
+    Кадр с несколькими «людьми»: уменьшенные копии образцов на сером фоне.
+    """
+    rng = np.random.default_rng(seed)
+    frame = np.full((h, w, 3), 90, dtype=np.uint8)
+    cell = w // people
+    for i in range(people):
+        src = sources[i % len(sources)]
+        ph = int(h * 0.8)
+        pw = min(cell, int(src.shape[1] * ph / src.shape[0]))
+        patch = cv2.resize(src, (pw, ph))
+        x = i * cell + int(rng.integers(0, max(1, cell - pw)))
+        frame[h - ph:, x:x + pw] = patch
+    return frame
+
+
+def synthetic_landmarks(rng):
+    return [SimpleNamespace(x=float(x), y=float(y), visibility=1.0)
+            for x, y in rng.random((33, 2))]
+
+
+# -------------------- ЗАМЕРЫ --------------------
+def timed(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return times
+
+
+def summary(times):
+    arr = np.asarray(times)
+    return {
+        "n": int(arr.size),
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p95_ms": round(float(np.percentile(arr, 95)), 3),
+        "mean_ms": round(float(arr.mean()), 3)
+    }
+
+
+def peak_rss_mb():
+    # ru_maxrss: килобайты на Linux, байты на macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def bench_stages(frames, repeats):
+    detector = models.get("detector")
+    pose = models.get("pose")
+    emotion = models.get("emotion")
+    rng = np.random.default_rng(0)
+
+    stages = {k: [] for k in ("detect", "pose", "detect_face", "emotion", "intent", "draw_text", "render")}
+    for frame in frames:
+        boxes = detector.detect(frame)
+        stages["detect"] += timed(lambda: detector.detect(frame), repeats)
+
+        crops = [frame[max(0, y1):y2, max(0, x1):x2] for x1, y1, x2, y2 in boxes] or [frame]
+        for person in crops:
+            if person.size == 0:
+                continue
+            stages["pose"] += timed(lambda: pose.estimate(person), repeats)
+            stages["detect_face"] += timed(lambda: pose.detect_face(person), repeats)
+            h, w = person.shape[:2]
+            face = person[: max(1, h // 4), w // 4: max(w // 4 + 1, 3 * w // 4)]
+            stages["emotion"] += timed(lambda: emotion.predict(face), repeats)
+
+        intent = IntentPredictor()
+        lms = synthetic_landmarks(rng)
+
+        def step():
+            intent.update((100, 100, 200, 400), lms)
+            intent.detect_action(lms)
+            intent.detect_intent(lms)
+
+        stages["intent"] += timed(step, repeats)
+
+        # рисуем на копии: общие кадры нужны чистыми для следующих замеров
+        canvas = frame.copy()
+        stages["draw_text"] += timed(lambda: draw_text(canvas, "действие: стоит (90%)", (50, 50), 28), repeats)
+
+        renderer = OverlayRenderer()
+
+        def render():
+            for i in range(5):
+                renderer.rect((10 + i * 100, 100), (90 + i * 100, 400))
+                renderer.text("действие: идёт (70%)", (10 + i * 100, 60), 28)
+                renderer.text("намерение: анализ...", (10 + i * 100, 90), 24)
+                renderer.text("эмоция: нейтральная (80%)", (10 + i * 100, 420), 24)
+            renderer.render(canvas)
+
+        stages["render"] += timed(render, repeats)
+
+    return {k: summary(v) for k, v in stages.items() if v}
+
+
+def bench_process_frame(frames, repeats):
+    """
+    Полный стек на каждом замере: max_reuse=0 отключает кэш трека,
+    иначе повтор того же кадра почти всегда берёт позу/эмоцию из кэша.
+    Отдельно — задержка кадра, когда все люди берутся из кэша трека.
+    """
+    times, cached = [], []
+    for frame in frames:
+        # свой трекер на каждое изображение: несвязанные кадры не сопоставляются
+        tracker = PersonTracker(max_reuse=0)
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            process_frame(frame.copy(), tracker)
+            times.append((time.perf_counter() - t0) * 1000)
+
+        # трекер с кэшем: первый вызов заполняет кэш, следующие — попадания
+        tracker = PersonTracker(max_reuse=repeats)
+        process_frame(frame.copy(), tracker)
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            process_frame(frame.copy(), tracker)
+            cached.append((time.perf_counter() - t0) * 1000)
+
+    res = summary(times)
+    res["fps"] = round(1000 / res["mean_ms"], 2)
+    res["cache_hit"] = summary(cached)
+    return res
+
+
+def bench_process_video(frame, n_frames):
+    h, w = frame.shape[:2]
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "in.mp4")
+        dst = os.path.join(tmp, "out.mp4")
+        out = cv2.VideoWriter(src, cv2.VideoWriter_fourcc(*"mp4v"), 25, (w, h))
+        for i in range(n_frames):
+            # лёгкий сдвиг, чтобы трекер и намерения видели движение
+            out.write(np.roll(frame, i * 4, axis=1))
+        out.release()
+
+        t0 = time.perf_counter()
+        process_video(src, dst)
+        elapsed = time.perf_counter() - t0
+    return {"frames": n_frames, "seconds": round(elapsed, 3), "fps": round(n_frames / elapsed, 2)}
+
+
+def compare(old_path, new_path):
+    old, new = json.load(open(old_path)), json.load(open(new_path))
+    print(f"{'стадия':>14} {'p50 было':>10} {'p50 стало':>10} {'Δ':>8}")
+    for name, cur in new["stages"].items():
+        prev = old["stages"].get(name)
+        if prev is None:
+            continue
+        delta = (cur["p50_ms"] - prev["p50_ms"]) / max(prev["p50_ms"], 1e-9) * 100
+        print(f"{name:>14} {prev['p50_ms']:>10.2f} {cur['p50_ms']:>10.2f} {delta:>+7.1f}%")
+    for key in ("process_frame", "process_video"):
+        print(f"{key:>14} fps: {old[key]['fps']} -> {new[key]['fps']}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--people", type=int, default=5)
+    parser.add_argument("--video-frames", type=int, default=60)
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    samples = sample_images()
+    sources = [img for _, img in samples]
+    frames = sources + [synthetic_frame(sources, args.people)]
+
+    t0 = time.perf_counter()
+    load = models.warmup("detector", "pose", "emotion")
+
+    results = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "samples": [name for name, _ in samples],
+            "synthetic_people": args.people,
+            "repeats": args.repeats
+        },
+        "model_load_s": {k: round(v, 3) for k, v in load.items()},
+        "stages": bench_stages(frames, args.repeats),
+        "process_frame": bench_process_frame(frames, args.repeats),
+        "process_video": bench_process_video(frames[-1], args.video_frames),
+    }
+    results["meta"]["total_s"] = round(time.perf_counter() - t0, 2)
+    results["peak_rss_mb"] = peak_rss_mb()
+
+    with open(args.out, "w") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+IntentBank должен выдавать для каждого человека ровно то же, что IntentPredictor.
+
+Запуск из корня репозитория:
+    python -m pytest -q tests
+"""
+import os
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+
+from intent_predictor import IntentBank, IntentPredictor  # noqa: E402
+
+
+def random_pose(rng):
+    return [SimpleNamespace(x=float(x), y=float(y), visibility=1.0)
+            for x, y in rng.random((33, 2))]
+
+
+class Person:
+    """Случайное блуждание бокса: то стоит, то идёт, то бежит и прыгает."""
+
+    def __init__(self, rng, slot):
+        self.rng = rng
+        self.slot = slot
+        self.reference = IntentPredictor()
+        self.cx, self.cy = rng.uniform(100, 500, 2)
+
+    def step(self):
+        scale = self.rng.choice([0.3, 2.0, 6.0, 12.0])
+        self.cx += self.rng.normal(0, scale)
+        self.cy += self.rng.normal(0, scale)
+        return (self.cx - 40, self.cy - 100, self.cx + 40, self.cy + 100)
+
+
+def test_bank_matches_predictor():
+    rng = np.random.default_rng(0)
+    bank = IntentBank(capacity=2)  # маленькая ёмкость — проверяем и рост буферов
+    people = [Person(rng, bank.add()) for _ in range(3)]
+    released = set()
+    reused = 0
+    actions = set()
+    steps = 0
+
+    for _ in range(600):
+        # как при вытеснении трека в PersonTracker: слот освобождается
+        # и сразу достаётся новому человеку с чистым состоянием
+        if people and rng.random() < 0.03:
+            gone = people.pop(int(rng.integers(len(people))))
+            bank.release(gone.slot)
+            released.add(gone.slot)
+        if rng.random() < 0.04 or not people:
+            slot = bank.add()
+            reused += slot in released
+            released.discard(slot)
+            people.append(Person(rng, slot))
+
+        poses = []
+        for p in people:
+            bbox, pose = p.step(), random_pose(rng)
+            frames = int(rng.choice([1, 1, 1, 2, 4]))
+            p.reference.update(bbox, pose, frames)
+            bank.update(p.slot, bbox, pose, frames)
+            poses.append(pose)
+
+        results = bank.detect([p.slot for p in people], poses)
+        for p, pose, (action, conf, intent, intent_conf) in zip(people, poses, results):
+            assert (action, conf) == p.reference.detect_action(pose)
+            assert (intent, intent_conf) == p.reference.detect_intent(pose)
+            actions.add(action)
+            steps += 1
+
+    assert steps > 1000
+    assert reused > 0
+    assert len(actions) > 3  # прошли разные ветки правил